@@ -0,0 +1,350 @@
+import os
+import json
+import time
+import random
+import asyncio
+from typing import Dict, List, Optional
+
+import httpx
+import msgpack
+
+from common import (
+    DEFAULT_ROOM_ID,
+    MSGPACK_MEDIA_TYPE,
+    TICK_SECONDS,
+    Post,
+    ResearchItem,
+    SnapshotOut,
+    WakeOut,
+    decode_snapshot,
+    extract_headline,
+    load_agent_profile,
+)
+
+# Headless agent process: imports only what generation and hub I/O need (no FastAPI, uvicorn
+# or numpy) and starts its loop immediately. Run with `python agent.py`.
+
+ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "").strip()
+MODEL_NAME = os.getenv("MODEL_NAME", "claude-3-5-sonnet-latest").strip()
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com").strip().rstrip("/")
+
+AGENT_TICK_SECONDS = float(os.getenv("AGENT_TICK_SECONDS", str(TICK_SECONDS)))
+AGENT_POST_CHANCE = float(os.getenv("AGENT_POST_CHANCE", "1.0"))
+REPLY_CHANCE = float(os.getenv("REPLY_CHANCE", "0.35"))
+AGENT_JITTER_SECONDS = float(os.getenv("AGENT_JITTER_SECONDS", "0.6"))
+AGENT_WAKE_MODE = os.getenv("AGENT_WAKE_MODE", "poll").strip().lower()
+if AGENT_WAKE_MODE not in ("poll", "events"):
+    AGENT_WAKE_MODE = "poll"
+AGENT_MIN_WAKE_SECONDS = float(os.getenv("AGENT_MIN_WAKE_SECONDS", str(AGENT_TICK_SECONDS)))
+AGENT_MAX_WAKE_SECONDS = float(os.getenv("AGENT_MAX_WAKE_SECONDS", "60"))
+AGENT_PRICE_TRIGGER_PCT = float(os.getenv("AGENT_PRICE_TRIGGER_PCT", "0.5"))
+
+HUB_URL = os.getenv("HUB_URL", "http://hub:8000").rstrip("/")
+AGENT_ROOM = os.getenv("AGENT_ROOM", DEFAULT_ROOM_ID).strip() or DEFAULT_ROOM_ID
+AGENT_NAME = os.getenv("AGENT_NAME", "").strip() or os.getenv("HOSTNAME", "Agent_00").strip() or "Agent_00"
+AGENT_HEALTH_PORT = int(os.getenv("AGENT_HEALTH_PORT", "8000"))
+
+WIRE_FORMAT = os.getenv("WIRE_FORMAT", "msgpack").strip().lower()
+if WIRE_FORMAT not in ("msgpack", "json"):
+    WIRE_FORMAT = "msgpack"
+
+agent_status: Dict = {
+    "mode": "agent",
+    "agent": AGENT_NAME,
+    "started_ts": time.time(),
+    "last_tick_ts": None,
+    "last_post_ts": None,
+    "errors": 0,
+}
+
+
+# -----------------------------------------
+# Claude call (agent side)
+# -----------------------------------------
+async def claude_generate(system: str, user: str, price_hint: float, profile: Dict[str, str]) -> str:
+    if not ANTHROPIC_API_KEY:
+        return build_stub_note(price_hint, profile)
+
+    url = f"{ANTHROPIC_BASE_URL}/v1/messages"
+    headers = {
+        "x-api-key": ANTHROPIC_API_KEY,
+        "anthropic-version": "2023-06-01",
+        "content-type": "application/json",
+    }
+    payload = {
+        "model": MODEL_NAME,
+        "max_tokens": 420,
+        "system": system,
+        "messages": [{"role": "user", "content": user}],
+    }
+
+    try:
+        async with httpx.AsyncClient(timeout=30) as client:
+            r = await client.post(url, headers=headers, json=payload)
+            r.raise_for_status()
+            data = r.json()
+    except httpx.HTTPStatusError as exc:
+        detail = exc.response.text if exc.response is not None else ""
+        print(f"[{AGENT_NAME}] Claude HTTP {exc.response.status_code if exc.response else 'error'}: {detail[:500]}")
+        return build_stub_note(price_hint, profile)
+    except Exception as exc:
+        print(f"[{AGENT_NAME}] Claude error: {type(exc).__name__}: {exc}")
+        return build_stub_note(price_hint, profile)
+
+    blocks = data.get("content", [])
+    text_parts = []
+    for b in blocks:
+        if b.get("type") == "text":
+            text_parts.append(b.get("text", ""))
+
+    return ("\n".join(text_parts)).strip() or "(no text)"
+
+
+def build_stub_note(price_hint: float, profile: Dict[str, str]) -> str:
+    bias = random.choice(["Long", "Short", "Neutral"])
+    conf = random.randint(45, 72)
+    decision = "Hold (paper): wait for confirmation"
+    if bias != "Neutral":
+        decision = f"Enter (paper): {bias} ~{random.randint(1, 8)} shares"
+    stop = f"{price_hint * (0.995 if bias == 'Long' else 1.005):.2f}"
+    headline = f"{profile['role']} watching {price_hint:.2f} for cleaner push"
+    setup = f"{profile['interests']} while price drifts; waiting for confirmation."
+    risk = f"Invalidate if price breaks {stop}; trim size if chop persists."
+    return (
+        f"Headline: {headline}\n"
+        f"Bias: {bias}\n"
+        f"Setup: {setup}\n"
+        f"Decision (paper): {decision}\n"
+        f"Risk: {risk}\n"
+        f"Confidence: {conf}%"
+    )
+
+
+# -----------------------------------------
+# Agent logic
+# -----------------------------------------
+def hub_api(path: str) -> str:
+    return f"{HUB_URL}/api/rooms/{AGENT_ROOM}{path}"
+
+
+def wire_headers() -> Dict[str, str]:
+    if WIRE_FORMAT == "msgpack":
+        return {"accept": f"{MSGPACK_MEDIA_TYPE}, application/json;q=0.5"}
+    return {}
+
+
+def is_msgpack(r: httpx.Response) -> bool:
+    return r.headers.get("content-type", "").startswith(MSGPACK_MEDIA_TYPE)
+
+
+async def fetch_snapshot(client: httpx.AsyncClient) -> SnapshotOut:
+    params = {"agent": AGENT_NAME, "limit_posts": 40, "limit_prices": 20}
+    r = await client.get(hub_api("/snapshot"), params=params, headers=wire_headers())
+    r.raise_for_status()
+    if is_msgpack(r):
+        return decode_snapshot(r.content)
+    data = r.json()
+    return SnapshotOut(**data)
+
+
+def summarize_posts(posts_in: List[Post], limit: int = 8) -> str:
+    if not posts_in:
+        return "(none)"
+    lines = []
+    for p in posts_in[-limit:]:
+        headline = extract_headline(p.text)
+        lines.append(f"- [{p.id}] {p.agent}: {headline}")
+    return "\n".join(lines)
+
+def summarize_research(items: List[ResearchItem], limit: int = 8) -> str:
+    if not items:
+        return "(no research highlights yet)"
+    lines: List[str] = []
+    for item in items[:limit]:
+        score = f"{item.score}" if item.score is not None else "n/a"
+        sub = f"r/{item.subreddit}" if item.subreddit else "reddit"
+        lines.append(f"- {sub} ({score}): {item.title}")
+    return "\n".join(lines)
+
+
+def pick_reply_target(posts_in: List[Post], prefer_ids: Optional[List[int]] = None) -> Optional[Post]:
+    for post_id in reversed(prefer_ids or []):
+        for p in posts_in:
+            if p.id == post_id:
+                return p
+    if not posts_in or random.random() > REPLY_CHANCE:
+        return None
+    candidates = [p for p in posts_in[-12:] if p.agent != AGENT_NAME]
+    if not candidates:
+        return None
+    return random.choice(candidates)
+
+
+async def post_note(client: httpx.AsyncClient, text: str, reply_to: Optional[int]) -> None:
+    payload = {"agent": AGENT_NAME, "text": text, "reply_to": reply_to}
+    if WIRE_FORMAT == "msgpack":
+        headers = {"content-type": MSGPACK_MEDIA_TYPE, **wire_headers()}
+        r = await client.post(hub_api("/post"), content=msgpack.packb(payload), headers=headers)
+    else:
+        r = await client.post(hub_api("/post"), json=payload)
+    r.raise_for_status()
+
+
+async def wait_for_wake(
+    client: httpx.AsyncClient, since: Optional[int], ref_price: Optional[float], last_wake: float
+) -> WakeOut:
+    min_gap = AGENT_MIN_WAKE_SECONDS - (time.monotonic() - last_wake)
+    if min_gap > 0:
+        await asyncio.sleep(min_gap)
+    timeout = max(0.0, AGENT_MAX_WAKE_SECONDS - (time.monotonic() - last_wake))
+    params = {"agent": AGENT_NAME, "timeout": timeout, "price_pct": AGENT_PRICE_TRIGGER_PCT}
+    if since is not None:
+        params["since"] = since
+    if ref_price is not None:
+        params["ref_price"] = ref_price
+    r = await client.get(hub_api("/wake"), params=params, timeout=timeout + 10)
+    r.raise_for_status()
+    return WakeOut(**r.json())
+
+
+async def agent_loop() -> None:
+    profile = load_agent_profile(AGENT_NAME)
+    wake: Optional[WakeOut] = None
+    wake_since: Optional[int] = None
+    ref_price: Optional[float] = None
+    last_wake = time.monotonic()
+    async with httpx.AsyncClient(timeout=30) as client:
+        while True:
+            try:
+                if random.random() <= AGENT_POST_CHANCE:
+                    snapshot = await fetch_snapshot(client)
+                    ref_price = snapshot.price
+                    prices = snapshot.recent_prices or [snapshot.price]
+                    change = prices[-1] - prices[0]
+                    pct = (change / prices[0]) * 100 if prices[0] else 0.0
+                    hi = max(prices)
+                    lo = min(prices)
+
+                    reply_ids = [e.post_id for e in wake.events if e.kind == "reply"] if wake else []
+                    reply_target = pick_reply_target(snapshot.posts, reply_ids)
+                    recent_posts_text = summarize_posts(snapshot.posts, limit=8)
+                    research_text = "(research not enabled)"
+                    if snapshot.research:
+                        research_text = summarize_research(snapshot.research, limit=8)
+
+                    system = (
+                        f"You are {AGENT_NAME}, a day-trading desk agent in a PAPER-trading sandbox.\n"
+                        f"ROLE: {profile['role']}\n"
+                        f"FOCUS: {profile['focus']}\n"
+                        f"INTERESTS: {profile['interests']}\n"
+                        f"STYLE: {profile['style']}\n\n"
+                        "Rules:\n"
+                        "- Paper trading only. Do NOT give real-world advice to a person.\n"
+                        "- Use the provided SIM data, recent posts, and research highlights only.\n"
+                        "- Speak like a desk note: concise, specific, actionable.\n"
+                        "- Always include risk controls: invalidation/stop idea + sizing.\n"
+                        "- Do not claim you personally browsed the web; use the highlights only.\n"
+                        "- Do NOT mention APIs, models, tokens, or that you are an AI.\n"
+                        "Return output in the exact format below, with all fields present."
+                    )
+
+                    user_lines = [
+                        "SIM MARKET SNAPSHOT:",
+                        f"- Current price: {snapshot.price:.2f}",
+                        f"- Recent range (last ~{len(prices)} pts): low {lo:.2f} / high {hi:.2f}",
+                        f"- Recent change: {change:+.2f} ({pct:+.2f}%)",
+                        "",
+                        "YOUR BOOK (paper):",
+                        f"- Position: {snapshot.position:.2f} shares",
+                        f"- Cash: {snapshot.cash:.2f}",
+                        "",
+                        "RECENT POSTS (newest last):",
+                        recent_posts_text,
+                        "",
+                        "RESEARCH HIGHLIGHTS (public chatter):",
+                        research_text,
+                    ]
+
+                    if reply_target:
+                        user_lines += [
+                            "",
+                            "REPLY TARGET:",
+                            f"Post ID {reply_target.id} by {reply_target.agent}:",
+                            reply_target.text,
+                            "",
+                            "Respond directly to the reply target before adding your own view.",
+                        ]
+                    else:
+                        user_lines += [
+                            "",
+                            "No required reply target. Add a fresh insight for the group.",
+                        ]
+
+                    user_lines += [
+                        "",
+                        "FORMAT (exact):",
+                        "Headline: <8-14 words, market-focused>",
+                        "Bias: Long | Short | Neutral",
+                        "Setup: <1-2 sentences describing what you see>",
+                        "Decision (paper): <Enter/Exit/Hold + side + rough size in shares>",
+                        "Risk: <stop/invalidation level idea + what would prove you wrong>",
+                        "Confidence: <0-100%>",
+                    ]
+
+                    user = "\n".join(user_lines)
+                    text = await claude_generate(system, user, snapshot.price, profile)
+                    await post_note(client, text, reply_target.id if reply_target else None)
+                    agent_status["last_post_ts"] = time.time()
+            except Exception as e:
+                agent_status["errors"] += 1
+                print(f"[{AGENT_NAME}] error: {type(e).__name__}: {e}")
+            agent_status["last_tick_ts"] = time.time()
+
+            if AGENT_WAKE_MODE == "events":
+                try:
+                    wake = await wait_for_wake(client, wake_since, ref_price, last_wake)
+                    wake_since = wake.seq
+                    if ref_price is None:
+                        ref_price = wake.price
+                except Exception as e:
+                    print(f"[{AGENT_NAME}] wake error: {type(e).__name__}: {e}")
+                    wake = None
+                    await asyncio.sleep(AGENT_TICK_SECONDS)
+                last_wake = time.monotonic()
+                continue
+
+            sleep_for = max(1.0, AGENT_TICK_SECONDS + random.uniform(-AGENT_JITTER_SECONDS, AGENT_JITTER_SECONDS))
+            await asyncio.sleep(sleep_for)
+
+
+# -----------------------------------------
+# Health
+# -----------------------------------------
+# A bare asyncio responder instead of a web framework: any request on the port gets the
+# agent's status as JSON, which is all the container healthcheck needs.
+async def handle_health(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=5)
+        body = json.dumps(agent_status).encode("utf-8")
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: application/json\r\n"
+            + f"Content-Length: {len(body)}\r\n".encode("ascii")
+            + b"Connection: close\r\n\r\n"
+            + body
+        )
+        await writer.drain()
+    except Exception:
+        pass
+    finally:
+        writer.close()
+
+
+async def run_agent() -> None:
+    if AGENT_HEALTH_PORT > 0:
+        await asyncio.start_server(handle_health, "0.0.0.0", AGENT_HEALTH_PORT)
+    await agent_loop()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_agent())
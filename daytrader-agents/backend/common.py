@@ -0,0 +1,411 @@
+import os
+import re
+import sys
+from array import array
+from typing import Dict, List, Optional
+
+import msgpack
+from pydantic import BaseModel
+
+
+def parse_bool(value: str, default: bool = False) -> bool:
+    if value is None:
+        return default
+    lowered = value.strip().lower()
+    if lowered in ("1", "true", "yes", "y", "on"):
+        return True
+    if lowered in ("0", "false", "no", "n", "off"):
+        return False
+    return default
+
+
+AGENT_COUNT = int(os.getenv("AGENT_COUNT", "33"))
+AGENT_LIST_ENV = os.getenv("AGENT_LIST", "").strip()
+
+TICK_SECONDS = float(os.getenv("TICK_SECONDS", "3"))
+
+ROOM_IDS = [s.strip() for s in os.getenv("ROOMS", "main").split(",") if s.strip()] or ["main"]
+DEFAULT_ROOM_ID = ROOM_IDS[0]
+
+
+# -----------------------------------------
+# Models shared by hub and agents
+# -----------------------------------------
+class Post(BaseModel):
+    id: int
+    ts: float
+    agent: str
+    text: str
+    reply_to: Optional[int] = None
+
+
+class Trade(BaseModel):
+    id: int
+    ts: float
+    agent: str
+    side: str  # BUY / SELL
+    qty: float
+    price: float
+
+
+class ResearchItem(BaseModel):
+    id: str
+    ts: float
+    source: str
+    title: str
+    url: str
+    score: Optional[int] = None
+    subreddit: Optional[str] = None
+    cluster_size: int = 1
+
+
+class MarketItem(BaseModel):
+    id: str
+    label: str
+    symbol: str
+    price: float
+    change_pct: float
+    change_pct_7d: Optional[float] = None
+    sparkline: Optional[List[float]] = None
+    source: str
+
+
+class StateOut(BaseModel):
+    price: float
+    posts: List[Post]
+    trades: List[Trade]
+
+
+class SnapshotOut(BaseModel):
+    price: float
+    recent_prices: List[float]
+    posts: List[Post]
+    position: float
+    cash: float
+    research: List[ResearchItem] = []
+
+
+class MarketsOut(BaseModel):
+    commodities: List[MarketItem]
+    cryptos: List[MarketItem]
+    updated_ts: float
+
+
+class PostIn(BaseModel):
+    agent: str
+    text: str
+    reply_to: Optional[int] = None
+
+
+class WakeEvent(BaseModel):
+    seq: int
+    kind: str  # price / reply / risk / research
+    post_id: Optional[int] = None
+
+
+class WakeOut(BaseModel):
+    seq: int
+    price: float
+    triggered: bool
+    events: List[WakeEvent]
+
+
+# -----------------------------------------
+# Wire format
+# -----------------------------------------
+# Compact msgpack bodies, negotiated via Accept / Content-Type. Lists of records are sent
+# column-wise: agent names are interned into a per-message table and numeric columns are
+# packed little-endian arrays (sparklines as float32), so a 40-post snapshot costs a handful
+# of small blobs.
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+WIRE_VERSION = 1
+
+
+def pack_array(typecode: str, values) -> bytes:
+    packed = array(typecode, values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_array(typecode: str, raw: bytes) -> List:
+    packed = array(typecode)
+    packed.frombytes(raw)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tolist()
+
+
+class NameTable:
+    def __init__(self, names: Optional[List[str]] = None) -> None:
+        self.names: List[str] = list(names or [])
+        self.index: Dict[str, int] = {n: i for i, n in enumerate(self.names)}
+
+    def intern(self, name: str) -> int:
+        idx = self.index.get(name)
+        if idx is None:
+            idx = len(self.names)
+            self.index[name] = idx
+            self.names.append(name)
+        return idx
+
+
+def pack_posts(items: List[Post], names: NameTable) -> Dict:
+    return {
+        "id": pack_array("q", [p.id for p in items]),
+        "ts": pack_array("d", [p.ts for p in items]),
+        "agent": pack_array("i", [names.intern(p.agent) for p in items]),
+        "reply_to": pack_array("q", [p.reply_to if p.reply_to is not None else -1 for p in items]),
+        "text": [p.text for p in items],
+    }
+
+
+def unpack_posts(data: Dict, names: List[str]) -> List[Post]:
+    cols = zip(
+        unpack_array("q", data["id"]),
+        unpack_array("d", data["ts"]),
+        unpack_array("i", data["agent"]),
+        unpack_array("q", data["reply_to"]),
+        data["text"],
+    )
+    return [
+        Post(id=i, ts=ts, agent=names[a], text=text, reply_to=r if r >= 0 else None)
+        for i, ts, a, r, text in cols
+    ]
+
+
+def pack_trades(items: List[Trade], names: NameTable) -> Dict:
+    return {
+        "id": pack_array("q", [t.id for t in items]),
+        "ts": pack_array("d", [t.ts for t in items]),
+        "agent": pack_array("i", [names.intern(t.agent) for t in items]),
+        "buy": bytes(1 if t.side == "BUY" else 0 for t in items),
+        "qty": pack_array("d", [t.qty for t in items]),
+        "price": pack_array("d", [t.price for t in items]),
+    }
+
+
+def pack_research(items: List[ResearchItem]) -> List[List]:
+    return [[r.id, r.ts, r.source, r.title, r.url, r.score, r.subreddit, r.cluster_size] for r in items]
+
+
+def unpack_research(rows: List[List]) -> List[ResearchItem]:
+    keys = ("id", "ts", "source", "title", "url", "score", "subreddit", "cluster_size")
+    return [ResearchItem(**dict(zip(keys, row))) for row in rows]
+
+
+def pack_markets(items: List[MarketItem]) -> List[List]:
+    return [
+        [
+            m.id,
+            m.label,
+            m.symbol,
+            m.price,
+            m.change_pct,
+            m.change_pct_7d,
+            pack_array("f", m.sparkline) if m.sparkline is not None else None,
+            m.source,
+        ]
+        for m in items
+    ]
+
+
+def unpack_markets(rows: List[List]) -> List[MarketItem]:
+    keys = ("id", "label", "symbol", "price", "change_pct", "change_pct_7d", "sparkline", "source")
+    out: List[MarketItem] = []
+    for row in rows:
+        fields = dict(zip(keys, row))
+        if fields["sparkline"] is not None:
+            fields["sparkline"] = unpack_array("f", fields["sparkline"])
+        out.append(MarketItem(**fields))
+    return out
+
+
+def encode_wire(model: BaseModel) -> Optional[bytes]:
+    names = NameTable()
+    if isinstance(model, SnapshotOut):
+        body = {
+            "price": model.price,
+            "recent_prices": pack_array("d", model.recent_prices),
+            "posts": pack_posts(model.posts, names),
+            "position": model.position,
+            "cash": model.cash,
+            "research": pack_research(model.research),
+        }
+    elif isinstance(model, StateOut):
+        body = {
+            "price": model.price,
+            "posts": pack_posts(model.posts, names),
+            "trades": pack_trades(model.trades, names),
+        }
+    elif isinstance(model, MarketsOut):
+        body = {
+            "commodities": pack_markets(model.commodities),
+            "cryptos": pack_markets(model.cryptos),
+            "updated_ts": model.updated_ts,
+        }
+    elif isinstance(model, Post):
+        body = {"posts": pack_posts([model], names)}
+    else:
+        return None
+    body["v"] = WIRE_VERSION
+    body["names"] = names.names
+    return msgpack.packb(body, use_bin_type=True)
+
+
+def decode_wire(raw: bytes) -> Dict:
+    body = msgpack.unpackb(raw, raw=False)
+    if body.get("v") != WIRE_VERSION:
+        raise ValueError(f"unsupported wire version: {body.get('v')}")
+    return body
+
+
+def decode_snapshot(raw: bytes) -> SnapshotOut:
+    body = decode_wire(raw)
+    return SnapshotOut(
+        price=body["price"],
+        recent_prices=unpack_array("d", body["recent_prices"]),
+        posts=unpack_posts(body["posts"], body["names"]),
+        position=body["position"],
+        cash=body["cash"],
+        research=unpack_research(body["research"]),
+    )
+
+
+# -----------------------------------------
+# Agent personas
+# -----------------------------------------
+ROLE_CYCLE = [
+    ("Momentum Scalper", "Trades breakouts/acceleration; tight stops; fast exits."),
+    ("Mean Reversion", "Fades extremes; looks for snapback; disciplined sizing."),
+    ("Market Microstructure", "Watches liquidity/chop; avoids bad fills; trade quality."),
+    ("Risk Manager", "Controls drawdown; enforces stops; reduces size in volatility."),
+    ("Macro/News", "Explains regime/catalysts; identifies risk-on/off conditions."),
+    ("Technicals", "Key levels, S/R, patterns; defines invalidation zones."),
+    ("Volatility", "Vol expansion/contraction; adapts sizing; avoids chop."),
+    ("Sentiment", "Crowd behavior; overreaction/underreaction; contrarian setups."),
+    ("Trend Follower", "Rides direction; waits for confirmation; uses trailing stops."),
+    ("Tape Reader", "Short-term flow; reacts to impulse; avoids false breaks."),
+    ("Quant-ish", "Simple rules; measures momentum/mean-rev; avoids narratives."),
+]
+
+INTERESTS = [
+    "Opening range breakouts and relative volume",
+    "VWAP reclaims and mean reversion fades",
+    "News catalysts and earnings reactions",
+    "Liquidity sweeps and stop runs",
+    "Index ETF trends and sector rotation",
+    "Volatility compression and expansion",
+    "Gap-and-go and gap-fade patterns",
+    "Support and resistance laddering",
+    "Tape speed and pullback entries",
+    "Risk sizing and drawdown control",
+    "Pairs and correlation shifts",
+]
+
+STYLE_NOTES = [
+    "Short sentences, no fluff.",
+    "Mentions key levels and invalidation.",
+    "Prefers clear if/then statements.",
+    "Gives a size range, not a single number.",
+    "Calls out liquidity and slippage risk.",
+    "Emphasizes patience and confirmation.",
+    "Notes when to reduce size in chop.",
+    "Highlights triggers and stop placement.",
+    "Uses confident but measured tone.",
+    "Focuses on trade quality over quantity.",
+    "Adds a quick alternate scenario.",
+]
+
+# Extra vocabulary per role so research headlines (which rarely use desk jargon) can match personas.
+ROLE_KEYWORDS = {
+    "Momentum Scalper": "breakout rally surge squeeze momentum runs ripping",
+    "Mean Reversion": "oversold overbought bounce pullback selloff rebound dip",
+    "Market Microstructure": "liquidity spread volume orders flow options dealers",
+    "Risk Manager": "risk drawdown loss hedge margin crash leverage",
+    "Macro/News": "fed rates inflation cpi jobs earnings tariffs recession economy news",
+    "Technicals": "support resistance chart levels pattern trendline",
+    "Volatility": "vix volatility swings crash spike options puts calls",
+    "Sentiment": "sentiment fear greed retail hype yolo bubble",
+    "Trend Follower": "trend rally bull bear highs lows",
+    "Tape Reader": "volume flow buyers sellers futures premarket",
+    "Quant-ish": "data model backtest correlation statistics returns",
+}
+
+
+def build_agent_list(count: int) -> List[str]:
+    if AGENT_LIST_ENV:
+        names = [a.strip() for a in AGENT_LIST_ENV.split(",") if a.strip()]
+        return names
+    return [f"Agent_{i:02d}" for i in range(1, count + 1)]
+
+
+def agent_index_from_name(name: str, total: int) -> int:
+    digits = "".join(ch for ch in name if ch.isdigit())
+    if digits:
+        try:
+            idx = int(digits)
+            if 1 <= idx <= total:
+                return idx - 1
+        except ValueError:
+            pass
+    return abs(hash(name)) % max(total, 1)
+
+
+def profile_for_agent(name: str) -> Dict[str, str]:
+    idx = agent_index_from_name(name, max(AGENT_COUNT, 1))
+    role, focus = ROLE_CYCLE[idx % len(ROLE_CYCLE)]
+    interests = INTERESTS[(idx * 3) % len(INTERESTS)]
+    style = STYLE_NOTES[(idx * 5) % len(STYLE_NOTES)]
+    return {
+        "role": role,
+        "focus": focus,
+        "interests": interests,
+        "style": style,
+    }
+
+
+def load_agent_profile(name: str) -> Dict[str, str]:
+    profile = profile_for_agent(name)
+    overrides = {
+        "role": os.getenv("AGENT_ROLE", "").strip(),
+        "focus": os.getenv("AGENT_FOCUS", "").strip(),
+        "interests": os.getenv("AGENT_INTERESTS", "").strip(),
+        "style": os.getenv("AGENT_STYLE", "").strip(),
+    }
+    for key, value in overrides.items():
+        if value:
+            profile[key] = value
+    return profile
+
+
+def extract_headline(text: str) -> str:
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.lower().startswith("headline:"):
+            line = line.split(":", 1)[1].strip()
+        return line[:120]
+    text = text.strip()
+    return text[:120] if text else "No headline"
+
+
+# -----------------------------------------
+# Text helpers
+# -----------------------------------------
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:['.][a-z0-9]+)*")
+SEARCH_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "if", "in", "into",
+    "is", "it", "of", "on", "or", "so", "that", "the", "then", "this", "to", "was", "with",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def stem(token: str) -> str:
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
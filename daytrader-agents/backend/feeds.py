@@ -0,0 +1,328 @@
+import os
+import time
+import zlib
+import random
+import asyncio
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+import msgpack
+
+from common import (
+    SEARCH_STOPWORDS,
+    MarketItem,
+    ResearchItem,
+    pack_markets,
+    pack_research,
+    parse_bool,
+    stem,
+    tokenize,
+)
+
+# Feed ingestion (Reddit research, Yahoo/CoinGecko markets) plus the CPU-heavy parts of it:
+# JSON parsing, model building and near-duplicate clustering. The hub runs this in a separate
+# worker process by default so none of it lands on the event loop that serves API requests.
+
+RESEARCH_ENABLED = parse_bool(os.getenv("RESEARCH_ENABLED", "1"), default=True)
+RESEARCH_TICK_SECONDS = float(os.getenv("RESEARCH_TICK_SECONDS", "120"))
+RESEARCH_MAX_ITEMS = int(os.getenv("RESEARCH_MAX_ITEMS", "80"))
+RESEARCH_ALLOW_NSFW = parse_bool(os.getenv("RESEARCH_ALLOW_NSFW", "0"), default=False)
+RESEARCH_USER_AGENT = os.getenv("RESEARCH_USER_AGENT", "daytrader-agents/0.1").strip()
+RESEARCH_DEDUP_THRESHOLD = float(os.getenv("RESEARCH_DEDUP_THRESHOLD", "0.6"))
+RESEARCH_MINHASH_PERMS = int(os.getenv("RESEARCH_MINHASH_PERMS", "64"))
+
+MARKET_FEED_ENABLED = parse_bool(os.getenv("MARKET_FEED_ENABLED", "1"), default=True)
+MARKET_REFRESH_SECONDS = float(os.getenv("MARKET_REFRESH_SECONDS", "120"))
+COMMODITY_SYMBOLS = [
+    s.strip()
+    for s in os.getenv("COMMODITY_SYMBOLS", "GC=F,SI=F,CL=F,HG=F").split(",")
+    if s.strip()
+]
+YAHOO_QUOTE_URL = os.getenv("YAHOO_QUOTE_URL", "https://query1.finance.yahoo.com/v7/finance/quote").strip()
+CRYPTO_LIMIT_ENV = int(os.getenv("CRYPTO_LIMIT", "0"))
+CRYPTO_LIMIT = CRYPTO_LIMIT_ENV if CRYPTO_LIMIT_ENV > 0 else max(len(COMMODITY_SYMBOLS), 4)
+COINGECKO_BASE_URL = os.getenv("COINGECKO_BASE_URL", "https://api.coingecko.com/api/v3").strip().rstrip("/")
+COINGECKO_API_KEY = os.getenv("COINGECKO_API_KEY", "").strip()
+COINGECKO_API_HEADER = os.getenv("COINGECKO_API_HEADER", "x-cg-demo-api-key").strip()
+
+REDDIT_BASE_URL = os.getenv("REDDIT_BASE_URL", "https://www.reddit.com").strip().rstrip("/")
+REDDIT_MODE = os.getenv("REDDIT_MODE", "hot").strip().lower()
+if REDDIT_MODE not in ("hot", "new", "top"):
+    REDDIT_MODE = "hot"
+REDDIT_LIMIT = int(os.getenv("REDDIT_LIMIT", "6"))
+REDDIT_SUBREDDITS = [
+    s.strip()
+    for s in os.getenv(
+        "REDDIT_SUBREDDITS",
+        "stocks,investing,wallstreetbets,options,futures,commodities,gold,silverbugs,oil,energy,news",
+    ).split(",")
+    if s.strip()
+]
+
+
+# -----------------------------------------
+# Research dedup
+# -----------------------------------------
+MINHASH_PRIME = (1 << 61) - 1
+MINHASH_BANDS = 16
+_minhash_rng = random.Random(1337)
+MINHASH_PARAMS = [
+    (_minhash_rng.randrange(1, MINHASH_PRIME), _minhash_rng.randrange(0, MINHASH_PRIME))
+    for _ in range(max(RESEARCH_MINHASH_PERMS, MINHASH_BANDS))
+]
+
+
+def title_shingles(title: str, size: int = 5) -> Set[str]:
+    # Character shingles over the normalized title survive small rewordings ("50bps" vs "50 bps").
+    text = " ".join(stem(t) for t in tokenize(title) if t not in SEARCH_STOPWORDS)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i : i + size] for i in range(len(text) - size + 1)}
+
+
+def minhash_signature(shingles: Set[str]) -> List[int]:
+    hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles] or [0]
+    return [min((a * h + b) % MINHASH_PRIME for h in hashes) for a, b in MINHASH_PARAMS]
+
+
+def dedupe_research(items: List[ResearchItem]) -> List[ResearchItem]:
+    # Cluster near-duplicate headlines (cross-posts, reworded wire stories) with MinHash + LSH
+    # banding and keep the best-scored item per cluster.
+    if not items:
+        return []
+    parent = list(range(len(items)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i: int, j: int) -> None:
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[rj] = ri
+
+    signatures = [minhash_signature(title_shingles(item.title)) for item in items]
+    rows = len(MINHASH_PARAMS) // MINHASH_BANDS
+    buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+    by_url: Dict[str, int] = {}
+    for i, (item, sig) in enumerate(zip(items, signatures)):
+        if "reddit.com" not in item.url:
+            if item.url in by_url:
+                union(by_url[item.url], i)
+            else:
+                by_url[item.url] = i
+        for band in range(MINHASH_BANDS):
+            key = (band, tuple(sig[band * rows : (band + 1) * rows]))
+            for j in buckets.get(key, []):
+                if find(i) == find(j):
+                    continue
+                same = sum(1 for x, y in zip(sig, signatures[j]) if x == y)
+                if same / len(sig) >= RESEARCH_DEDUP_THRESHOLD:
+                    union(i, j)
+            buckets.setdefault(key, []).append(i)
+
+    clusters: Dict[int, List[ResearchItem]] = {}
+    for i, item in enumerate(items):
+        clusters.setdefault(find(i), []).append(item)
+    out: List[ResearchItem] = []
+    for members in clusters.values():
+        best = max(members, key=lambda x: ((x.score or 0), x.ts))
+        out.append(best.model_copy(update={"cluster_size": len(members)}))
+    return out
+
+
+# -----------------------------------------
+# Fetchers
+# -----------------------------------------
+def normalize_reddit_url(url: str, permalink: str) -> str:
+    if url:
+        return url
+    if permalink:
+        return f"https://www.reddit.com{permalink}"
+    return "https://www.reddit.com"
+
+def commodity_label(symbol: str) -> str:
+    labels = {
+        "GC=F": "Gold",
+        "SI=F": "Silver",
+        "CL=F": "WTI Crude",
+        "BZ=F": "Brent Crude",
+        "HG=F": "Copper",
+        "NG=F": "Nat Gas",
+    }
+    return labels.get(symbol, symbol)
+
+def build_reddit_item(subreddit: str, data: Dict) -> Optional[ResearchItem]:
+    if not data:
+        return None
+    if data.get("over_18") and not RESEARCH_ALLOW_NSFW:
+        return None
+    title = (data.get("title") or "").strip()
+    if not title:
+        return None
+    permalink = (data.get("permalink") or "").strip()
+    url = normalize_reddit_url(
+        (data.get("url_overridden_by_dest") or data.get("url") or "").strip(), permalink
+    )
+    item_id = data.get("name") or data.get("id") or f"{subreddit}:{hash(title)}"
+    ts = float(data.get("created_utc") or time.time())
+    score = data.get("score")
+    return ResearchItem(
+        id=f"reddit:{item_id}",
+        ts=ts,
+        source="reddit",
+        title=title,
+        url=url,
+        score=score,
+        subreddit=subreddit,
+    )
+
+async def fetch_reddit_items(client: httpx.AsyncClient) -> List[ResearchItem]:
+    if not REDDIT_SUBREDDITS:
+        return []
+    items: List[ResearchItem] = []
+    for subreddit in REDDIT_SUBREDDITS:
+        url = f"{REDDIT_BASE_URL}/r/{subreddit}/{REDDIT_MODE}.json?limit={REDDIT_LIMIT}"
+        try:
+            r = await client.get(url)
+            r.raise_for_status()
+            payload = r.json()
+        except Exception as exc:
+            print(f"[research] reddit fetch failed for r/{subreddit}: {type(exc).__name__}: {exc}")
+            continue
+
+        for child in payload.get("data", {}).get("children", []):
+            if child.get("kind") != "t3":
+                continue
+            item = build_reddit_item(subreddit, child.get("data") or {})
+            if item:
+                items.append(item)
+
+    items = dedupe_research(items)
+    items.sort(key=lambda x: ((x.score or 0), x.ts), reverse=True)
+    return items[:RESEARCH_MAX_ITEMS]
+
+async def fetch_commodities(client: httpx.AsyncClient) -> List[MarketItem]:
+    if not COMMODITY_SYMBOLS:
+        return []
+    url = YAHOO_QUOTE_URL
+    params = {"symbols": ",".join(COMMODITY_SYMBOLS)}
+    r = await client.get(url, params=params)
+    r.raise_for_status()
+    payload = r.json()
+    results = payload.get("quoteResponse", {}).get("result", [])
+    items: List[MarketItem] = []
+    for row in results:
+        symbol = row.get("symbol")
+        price = row.get("regularMarketPrice")
+        change_pct = row.get("regularMarketChangePercent")
+        if symbol is None or price is None or change_pct is None:
+            continue
+        items.append(
+            MarketItem(
+                id=f"yahoo:{symbol}",
+                label=commodity_label(symbol),
+                symbol=symbol,
+                price=float(price),
+                change_pct=float(change_pct),
+                source="yahoo",
+            )
+        )
+    return items
+
+async def fetch_cryptos(client: httpx.AsyncClient) -> List[MarketItem]:
+    url = f"{COINGECKO_BASE_URL}/coins/markets"
+    params = {
+        "vs_currency": "usd",
+        "order": "market_cap_desc",
+        "per_page": CRYPTO_LIMIT,
+        "page": 1,
+        "sparkline": "true",
+        "price_change_percentage": "24h,7d",
+    }
+    headers = {}
+    if COINGECKO_API_KEY and COINGECKO_API_HEADER:
+        headers[COINGECKO_API_HEADER] = COINGECKO_API_KEY
+    r = await client.get(url, params=params, headers=headers)
+    r.raise_for_status()
+    payload = r.json()
+    items: List[MarketItem] = []
+    for row in payload:
+        price = row.get("current_price")
+        change_pct = row.get("price_change_percentage_24h")
+        change_pct_7d = row.get("price_change_percentage_7d_in_currency")
+        sparkline = None
+        spark = row.get("sparkline_in_7d")
+        if isinstance(spark, dict):
+            sparkline = spark.get("price")
+        if price is None or change_pct is None:
+            continue
+        items.append(
+            MarketItem(
+                id=f"cg:{row.get('id')}",
+                label=row.get("name") or row.get("symbol", "").upper(),
+                symbol=(row.get("symbol") or "").upper(),
+                price=float(price),
+                change_pct=float(change_pct),
+                change_pct_7d=float(change_pct_7d) if change_pct_7d is not None else None,
+                sparkline=sparkline,
+                source="coingecko",
+            )
+        )
+    return items
+
+
+# -----------------------------------------
+# Feed loops
+# -----------------------------------------
+async def research_feed(publish: Callable[[str, bytes], None]) -> None:
+    headers = {"User-Agent": RESEARCH_USER_AGENT}
+    async with httpx.AsyncClient(timeout=20, headers=headers) as client:
+        while True:
+            try:
+                new_items = await fetch_reddit_items(client)
+                if new_items:
+                    publish("research", msgpack.packb(pack_research(new_items), use_bin_type=True))
+            except Exception as exc:
+                print(f"[research] loop error: {type(exc).__name__}: {exc}")
+            await asyncio.sleep(RESEARCH_TICK_SECONDS)
+
+
+async def market_feed(publish: Callable[[str, bytes], None]) -> None:
+    headers = {"User-Agent": "daytrader-agents/0.1"}
+    async with httpx.AsyncClient(timeout=20, headers=headers) as client:
+        while True:
+            try:
+                commodities = await fetch_commodities(client)
+                cryptos = await fetch_cryptos(client)
+                if commodities or cryptos:
+                    body = {
+                        "commodities": pack_markets(commodities) if commodities else None,
+                        "cryptos": pack_markets(cryptos) if cryptos else None,
+                        "updated_ts": time.time(),
+                    }
+                    publish("markets", msgpack.packb(body, use_bin_type=True))
+            except Exception as exc:
+                print(f"[markets] loop error: {type(exc).__name__}: {exc}")
+            await asyncio.sleep(MARKET_REFRESH_SECONDS)
+
+
+async def run_feeds(publish: Callable[[str, bytes], None]) -> None:
+    tasks = []
+    if RESEARCH_ENABLED:
+        tasks.append(research_feed(publish))
+    if MARKET_FEED_ENABLED:
+        tasks.append(market_feed(publish))
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+def worker_main(queue) -> None:
+    # Entry point of the feed worker process: results go back to the hub as (kind, msgpack bytes).
+    asyncio.run(run_feeds(lambda kind, body: queue.put((kind, body))))
+
+
+def feeds_enabled() -> bool:
+    return RESEARCH_ENABLED or MARKET_FEED_ENABLED
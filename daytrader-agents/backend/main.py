@@ -1,24 +1,64 @@
 import os
+import re
+import gzip
+import math
 import time
+import heapq
+import bisect
+import itertools
+import queue
 import random
 import asyncio
-from typing import Dict, List, Optional, Tuple
-
-import httpx
-from fastapi import FastAPI, HTTPException
+import threading
+import multiprocessing
+from collections import deque
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import msgpack
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-
-
-def parse_bool(value: str, default: bool = False) -> bool:
-    if value is None:
-        return default
-    lowered = value.strip().lower()
-    if lowered in ("1", "true", "yes", "y", "on"):
-        return True
-    if lowered in ("0", "false", "no", "n", "off"):
-        return False
-    return default
+from pydantic import BaseModel, Field
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+import feeds
+from agent import AGENT_PRICE_TRIGGER_PCT, ANTHROPIC_API_KEY, MODEL_NAME, agent_loop
+from common import (
+    AGENT_COUNT,
+    DEFAULT_ROOM_ID,
+    MSGPACK_MEDIA_TYPE,
+    ROLE_KEYWORDS,
+    ROOM_IDS,
+    SEARCH_STOPWORDS,
+    TICK_SECONDS,
+    MarketItem,
+    MarketsOut,
+    Post,
+    PostIn,
+    ResearchItem,
+    SnapshotOut,
+    StateOut,
+    Trade,
+    WakeEvent,
+    WakeOut,
+    build_agent_list,
+    encode_wire,
+    parse_bool,
+    profile_for_agent,
+    stem,
+    tokenize,
+    unpack_markets,
+    unpack_research,
+)
 
 
 MODE = os.getenv("MODE", "hub").strip().lower()
@@ -27,62 +67,37 @@ if MODE not in ("hub", "agent"):
 IS_HUB = MODE == "hub"
 IS_AGENT = MODE == "agent"
 
-ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "").strip()
-MODEL_NAME = os.getenv("MODEL_NAME", "claude-3-5-sonnet-latest").strip()
-
-AGENT_COUNT = int(os.getenv("AGENT_COUNT", "33"))
-AGENT_LIST_ENV = os.getenv("AGENT_LIST", "").strip()
-
-TICK_SECONDS = float(os.getenv("TICK_SECONDS", "3"))
 PRICE_TICK_SECONDS = float(os.getenv("PRICE_TICK_SECONDS", str(TICK_SECONDS)))
-AGENT_TICK_SECONDS = float(os.getenv("AGENT_TICK_SECONDS", str(TICK_SECONDS)))
-AGENT_POST_CHANCE = float(os.getenv("AGENT_POST_CHANCE", "1.0"))
-REPLY_CHANCE = float(os.getenv("REPLY_CHANCE", "0.35"))
-AGENT_JITTER_SECONDS = float(os.getenv("AGENT_JITTER_SECONDS", "0.6"))
+WAKE_MAX_TIMEOUT = float(os.getenv("WAKE_MAX_TIMEOUT", "120"))
+WAKE_EVENT_BACKLOG = int(os.getenv("WAKE_EVENT_BACKLOG", "5000"))
 TRADE_CHANCE = float(os.getenv("TRADE_CHANCE", "0.25"))
 
 MAX_POSTS = int(os.getenv("MAX_POSTS", "2000"))
 MAX_TRADES = int(os.getenv("MAX_TRADES", "2000"))
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "100"))
+SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "2000"))
+SEARCH_MAX_SCAN = int(os.getenv("SEARCH_MAX_SCAN", "5000"))
+SEARCH_MAX_PHRASE_CHECKS = int(os.getenv("SEARCH_MAX_PHRASE_CHECKS", "1000"))
+PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "500"))
 
 START_PRICE = float(os.getenv("START_PRICE", "100"))
 START_CASH = float(os.getenv("START_CASH", "100000"))
+SIM_SYMBOL = os.getenv("SIM_SYMBOL", "SIM").strip() or "SIM"
+
+RISK_MAX_LEVERAGE = float(os.getenv("RISK_MAX_LEVERAGE", "2.0"))
+RISK_MAINT_MARGIN_PCT = float(os.getenv("RISK_MAINT_MARGIN_PCT", "0.3"))
+RISK_MAX_DRAWDOWN_PCT = float(os.getenv("RISK_MAX_DRAWDOWN_PCT", "25"))
 
-HUB_URL = os.getenv("HUB_URL", "http://hub:8000").rstrip("/")
-AGENT_NAME = os.getenv("AGENT_NAME", "").strip()
-if IS_AGENT and not AGENT_NAME:
-    AGENT_NAME = os.getenv("HOSTNAME", "Agent_00").strip() or "Agent_00"
+MAX_ROOMS = int(os.getenv("MAX_ROOMS", "64"))
+ROOM_MAX_AGENTS = int(os.getenv("ROOM_MAX_AGENTS", "5000"))
+ROOM_MAX_HISTORY = int(os.getenv("ROOM_MAX_HISTORY", "500000"))
+ROOM_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+TIMER_RESOLUTION_SECONDS = float(os.getenv("TIMER_RESOLUTION_SECONDS", "0.05"))
 
-RESEARCH_ENABLED = parse_bool(os.getenv("RESEARCH_ENABLED", "1"), default=True)
-RESEARCH_TICK_SECONDS = float(os.getenv("RESEARCH_TICK_SECONDS", "120"))
-RESEARCH_MAX_ITEMS = int(os.getenv("RESEARCH_MAX_ITEMS", "80"))
 RESEARCH_SNAPSHOT_LIMIT = int(os.getenv("RESEARCH_SNAPSHOT_LIMIT", "12"))
-RESEARCH_ALLOW_NSFW = parse_bool(os.getenv("RESEARCH_ALLOW_NSFW", "0"), default=False)
-RESEARCH_USER_AGENT = os.getenv("RESEARCH_USER_AGENT", "daytrader-agents/0.1").strip()
-
-MARKET_FEED_ENABLED = parse_bool(os.getenv("MARKET_FEED_ENABLED", "1"), default=True)
-MARKET_REFRESH_SECONDS = float(os.getenv("MARKET_REFRESH_SECONDS", "120"))
-COMMODITY_SYMBOLS = [
-    s.strip()
-    for s in os.getenv("COMMODITY_SYMBOLS", "GC=F,SI=F,CL=F,HG=F").split(",")
-    if s.strip()
-]
-CRYPTO_LIMIT_ENV = int(os.getenv("CRYPTO_LIMIT", "0"))
-CRYPTO_LIMIT = CRYPTO_LIMIT_ENV if CRYPTO_LIMIT_ENV > 0 else max(len(COMMODITY_SYMBOLS), 4)
-COINGECKO_API_KEY = os.getenv("COINGECKO_API_KEY", "").strip()
-COINGECKO_API_HEADER = os.getenv("COINGECKO_API_HEADER", "x-cg-demo-api-key").strip()
-
-REDDIT_MODE = os.getenv("REDDIT_MODE", "hot").strip().lower()
-if REDDIT_MODE not in ("hot", "new", "top"):
-    REDDIT_MODE = "hot"
-REDDIT_LIMIT = int(os.getenv("REDDIT_LIMIT", "6"))
-REDDIT_SUBREDDITS = [
-    s.strip()
-    for s in os.getenv(
-        "REDDIT_SUBREDDITS",
-        "stocks,investing,wallstreetbets,options,futures,commodities,gold,silverbugs,oil,energy,news",
-    ).split(",")
-    if s.strip()
-]
+FEED_WORKER_ENABLED = parse_bool(os.getenv("FEED_WORKER_ENABLED", "1"), default=True)
+
+WIRE_COMPRESS_MIN_BYTES = int(os.getenv("WIRE_COMPRESS_MIN_BYTES", "1024"))
 
 
 # -----------------------------------------
@@ -103,48 +118,59 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def compress_responses(request: Request, call_next):
+    response = await call_next(request)
+    encoding = pick_encoding(request.headers.get("accept-encoding", ""))
+    content_type = response.headers.get("content-type", "")
+    if (
+        encoding is None
+        or "content-encoding" in response.headers
+        or not content_type.startswith(("application/json", MSGPACK_MEDIA_TYPE))
+    ):
+        return response
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    headers["vary"] = f"{headers['vary']}, Accept-Encoding" if headers.get("vary") else "Accept-Encoding"
+    if len(body) >= WIRE_COMPRESS_MIN_BYTES:
+        body = compress_body(encoding, body)
+        headers["content-encoding"] = encoding
+    return Response(content=body, status_code=response.status_code, headers=headers)
+
+
 # -----------------------------------------
 # Models
 # -----------------------------------------
-class Post(BaseModel):
-    id: int
-    ts: float
-    agent: str
-    text: str
-    reply_to: Optional[int] = None
-
-
-class Trade(BaseModel):
-    id: int
-    ts: float
-    agent: str
-    side: str  # BUY / SELL
-    qty: float
-    price: float
-
-
-class ResearchItem(BaseModel):
+class RoomConfig(BaseModel):
+    agent_count: int = Field(AGENT_COUNT, ge=1, le=ROOM_MAX_AGENTS)
+    agent_list: Optional[List[str]] = Field(None, min_length=1, max_length=ROOM_MAX_AGENTS)
+    start_price: float = Field(START_PRICE, gt=0, le=1e9)
+    start_cash: float = Field(START_CASH, gt=0, le=1e12)
+    price_tick_seconds: float = Field(PRICE_TICK_SECONDS, ge=0.1, le=3600)
+    price_drift_pct: float = Field(0.01, ge=-10, le=10)
+    price_vol_pct: float = Field(0.35, ge=0, le=50)
+    trade_chance: float = Field(TRADE_CHANCE, ge=0, le=1)
+    max_posts: int = Field(MAX_POSTS, ge=1, le=ROOM_MAX_HISTORY)
+    max_trades: int = Field(MAX_TRADES, ge=1, le=ROOM_MAX_HISTORY)
+
+
+class RoomIn(BaseModel):
     id: str
-    ts: float
-    source: str
-    title: str
-    url: str
-    score: Optional[int] = None
-    subreddit: Optional[str] = None
+    config: RoomConfig = RoomConfig()
 
 
-class MarketItem(BaseModel):
+class RoomOut(BaseModel):
     id: str
-    label: str
-    symbol: str
+    created_ts: float
     price: float
-    change_pct: float
-    change_pct_7d: Optional[float] = None
-    sparkline: Optional[List[float]] = None
-    source: str
+    agent_count: int
+    post_count: int
+    trade_count: int
+    config: RoomConfig
 
 
 class ConfigOut(BaseModel):
+    room_id: str
     agent_count: int
     tick_seconds: float
     max_posts_per_tick: int
@@ -153,252 +179,613 @@ class ConfigOut(BaseModel):
     mode: str
 
 
-class StateOut(BaseModel):
-    price: float
-    posts: List[Post]
-    trades: List[Trade]
-
-
 class AgentPnL(BaseModel):
     agent: str
     cash: float
     position: float
     equity: float
+    gross_exposure: float = 0.0
+    drawdown_pct: float = 0.0
 
 
-class SnapshotOut(BaseModel):
-    price: float
-    recent_prices: List[float]
-    posts: List[Post]
-    position: float
-    cash: float
-    research: List[ResearchItem] = []
+class AgentRisk(BaseModel):
+    agent: str
+    equity: float
+    gross_exposure: float
+    net_exposure: float
+    margin_required: float
+    leverage: Optional[float] = None
+    drawdown_pct: float
+    breaches: List[str]
 
 
-class MarketsOut(BaseModel):
-    commodities: List[MarketItem]
-    cryptos: List[MarketItem]
-    updated_ts: float
+class RiskOut(BaseModel):
+    ts: float
+    agents: List[AgentRisk]
 
 
-class PostIn(BaseModel):
-    agent: str
-    text: str
-    reply_to: Optional[int] = None
+class SearchHit(BaseModel):
+    kind: str  # post / research
+    score: float
+    post: Optional[Post] = None
+    research: Optional[ResearchItem] = None
+
+
+class SearchOut(BaseModel):
+    query: str
+    matched: int  # matches among the docs scanned, at most SEARCH_MAX_CANDIDATES
+    truncated: bool  # scan stopped at a cap; older docs were not checked, counted or ranked
+    hits: List[SearchHit]
+
+
+class PostPage(BaseModel):
+    items: List[Post]
+    next_before_id: Optional[int] = None
+
+
+class TradePage(BaseModel):
+    items: List[Trade]
+    next_before_id: Optional[int] = None
 
 
 # -----------------------------------------
-# Agent personas
+# Wire format + compression
 # -----------------------------------------
-ROLE_CYCLE = [
-    ("Momentum Scalper", "Trades breakouts/acceleration; tight stops; fast exits."),
-    ("Mean Reversion", "Fades extremes; looks for snapback; disciplined sizing."),
-    ("Market Microstructure", "Watches liquidity/chop; avoids bad fills; trade quality."),
-    ("Risk Manager", "Controls drawdown; enforces stops; reduces size in volatility."),
-    ("Macro/News", "Explains regime/catalysts; identifies risk-on/off conditions."),
-    ("Technicals", "Key levels, S/R, patterns; defines invalidation zones."),
-    ("Volatility", "Vol expansion/contraction; adapts sizing; avoids chop."),
-    ("Sentiment", "Crowd behavior; overreaction/underreaction; contrarian setups."),
-    ("Trend Follower", "Rides direction; waits for confirmation; uses trailing stops."),
-    ("Tape Reader", "Short-term flow; reacts to impulse; avoids false breaks."),
-    ("Quant-ish", "Simple rules; measures momentum/mean-rev; avoids narratives."),
-]
-
-INTERESTS = [
-    "Opening range breakouts and relative volume",
-    "VWAP reclaims and mean reversion fades",
-    "News catalysts and earnings reactions",
-    "Liquidity sweeps and stop runs",
-    "Index ETF trends and sector rotation",
-    "Volatility compression and expansion",
-    "Gap-and-go and gap-fade patterns",
-    "Support and resistance laddering",
-    "Tape speed and pullback entries",
-    "Risk sizing and drawdown control",
-    "Pairs and correlation shifts",
-]
-
-STYLE_NOTES = [
-    "Short sentences, no fluff.",
-    "Mentions key levels and invalidation.",
-    "Prefers clear if/then statements.",
-    "Gives a size range, not a single number.",
-    "Calls out liquidity and slippage risk.",
-    "Emphasizes patience and confirmation.",
-    "Notes when to reduce size in chop.",
-    "Highlights triggers and stop placement.",
-    "Uses confident but measured tone.",
-    "Focuses on trade quality over quantity.",
-    "Adds a quick alternate scenario.",
-]
-
-
-def build_agent_list(count: int) -> List[str]:
-    if AGENT_LIST_ENV:
-        names = [a.strip() for a in AGENT_LIST_ENV.split(",") if a.strip()]
-        return names
-    return [f"Agent_{i:02d}" for i in range(1, count + 1)]
-
-
-def agent_index_from_name(name: str, total: int) -> int:
-    digits = "".join(ch for ch in name if ch.isdigit())
-    if digits:
-        try:
-            idx = int(digits)
-            if 1 <= idx <= total:
-                return idx - 1
-        except ValueError:
-            pass
-    return abs(hash(name)) % max(total, 1)
-
-
-def profile_for_agent(name: str) -> Dict[str, str]:
-    idx = agent_index_from_name(name, max(AGENT_COUNT, 1))
-    role, focus = ROLE_CYCLE[idx % len(ROLE_CYCLE)]
-    interests = INTERESTS[(idx * 3) % len(INTERESTS)]
-    style = STYLE_NOTES[(idx * 5) % len(STYLE_NOTES)]
-    return {
-        "role": role,
-        "focus": focus,
-        "interests": interests,
-        "style": style,
-    }
+def accepts_msgpack(request: Request) -> bool:
+    return MSGPACK_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def negotiated(request: Request, model: BaseModel) -> Response:
+    # The body format depends on Accept, so both branches must say so to caches.
+    if accepts_msgpack(request):
+        raw = encode_wire(model)
+        if raw is not None:
+            return Response(content=raw, media_type=MSGPACK_MEDIA_TYPE, headers={"vary": "Accept"})
+    return Response(content=model.model_dump_json(), media_type="application/json", headers={"vary": "Accept"})
+
+
+# Response compression, best codec first; brotli and zstandard are optional installs.
+def available_encodings() -> List[str]:
+    out: List[str] = []
+    if zstandard is not None:
+        out.append("zstd")
+    if brotli is not None:
+        out.append("br")
+    out.append("gzip")
+    return out
+
+
+def pick_encoding(accept_encoding: str) -> Optional[str]:
+    offered: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            offered[token.strip().lower()] = q
+    for encoding in available_encodings():
+        if offered.get(encoding, offered.get("*", 0.0)) > 0:
+            return encoding
+    return None
 
 
-def load_agent_profile(name: str) -> Dict[str, str]:
-    profile = profile_for_agent(name)
-    overrides = {
-        "role": os.getenv("AGENT_ROLE", "").strip(),
-        "focus": os.getenv("AGENT_FOCUS", "").strip(),
-        "interests": os.getenv("AGENT_INTERESTS", "").strip(),
-        "style": os.getenv("AGENT_STYLE", "").strip(),
-    }
-    for key, value in overrides.items():
-        if value:
-            profile[key] = value
-    return profile
+def compress_body(encoding: str, body: bytes) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    if encoding == "br":
+        return brotli.compress(body, quality=4)
+    return gzip.compress(body, compresslevel=5)
+
 
+# -----------------------------------------
+# Full-text search
+# -----------------------------------------
+PHRASE_RE = re.compile(r'"([^"]*)"')
+# Desk-note field labels appear in every post; strip them so they don't flood postings.
+NOTE_LABEL_RE = re.compile(
+    r"^\s*(headline|bias|setup|decision \(paper\)|risk|confidence)\s*:", re.IGNORECASE | re.MULTILINE
+)
+class SearchIndex:
+    # Inverted index with term positions (for phrases) and facet postings (for filters).
+    # Postings are insertion-ordered dicts, so walking them in reverse visits newest docs first;
+    # BM25 ranks only the newest max_candidates matches. The intersection considers only the
+    # newest max_scan keys of the rarest list, and at most max_phrase_checks docs get a phrase
+    # check, so cost stays bounded even when terms rarely co-occur. A hit outside that window is
+    # never returned, however well it would score.
+
+    def __init__(
+        self,
+        k1: float = 1.2,
+        b: float = 0.75,
+        max_candidates: int = SEARCH_MAX_CANDIDATES,
+        max_scan: int = SEARCH_MAX_SCAN,
+        max_phrase_checks: int = SEARCH_MAX_PHRASE_CHECKS,
+    ) -> None:
+        self.k1 = k1
+        self.b = b
+        self.max_candidates = max_candidates
+        self.max_scan = max_scan
+        self.max_phrase_checks = max_phrase_checks
+        self.postings: Dict[str, Dict[str, List[int]]] = {}
+        self.facets: Dict[Tuple[str, str], Dict[str, None]] = {}
+        self.docs: Dict[str, Tuple[int, List[str], List[Tuple[str, str]], object]] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add(self, key: str, text: str, facets: Dict[str, Optional[str]], obj: object) -> None:
+        if key in self.docs:
+            self.remove(key)
+        positions: Dict[str, List[int]] = {}
+        tokens = tokenize(NOTE_LABEL_RE.sub(" ", text))
+        for pos, token in enumerate(tokens):
+            if token in SEARCH_STOPWORDS:
+                continue
+            positions.setdefault(token, []).append(pos)
+        for term, where in positions.items():
+            self.postings.setdefault(term, {})[key] = where
+        facet_keys = [(name, value.lower()) for name, value in facets.items() if value]
+        for facet in facet_keys:
+            self.facets.setdefault(facet, {})[key] = None
+        length = sum(len(where) for where in positions.values())
+        self.docs[key] = (length, list(positions), facet_keys, obj)
+        self.total_length += length
+
+    def remove(self, key: str) -> None:
+        doc = self.docs.pop(key, None)
+        if doc is None:
+            return
+        length, terms, facet_keys, _ = doc
+        for term in terms:
+            bucket = self.postings.get(term)
+            if bucket is None:
+                continue
+            bucket.pop(key, None)
+            if not bucket:
+                del self.postings[term]
+        for facet in facet_keys:
+            bucket = self.facets.get(facet)
+            if bucket is None:
+                continue
+            bucket.pop(key, None)
+            if not bucket:
+                del self.facets[facet]
+        self.total_length -= length
+
+    def parse_query(self, query: str) -> Tuple[List[str], List[List[Tuple[str, int]]]]:
+        phrases: List[List[Tuple[str, int]]] = []
+        for raw in PHRASE_RE.findall(query):
+            words = [(t, i) for i, t in enumerate(tokenize(raw)) if t not in SEARCH_STOPWORDS]
+            if len(words) > 1:
+                phrases.append(words)
+        terms: List[str] = []
+        for token in tokenize(query.replace('"', " ")):
+            if token not in SEARCH_STOPWORDS and token not in terms:
+                terms.append(token)
+        return terms, phrases
+
+    def matches_phrase(self, key: str, phrase: List[Tuple[str, int]]) -> bool:
+        # Narrow the first term's positions one phrase word at a time (position lists are short).
+        first_term, first_offset = phrase[0]
+        starts = self.postings[first_term][key]
+        for term, offset in phrase[1:]:
+            where = self.postings[term][key]
+            delta = offset - first_offset
+            starts = [start for start in starts if start + delta in where]
+            if not starts:
+                return False
+        return True
+
+    def search(
+        self, query: str, filters: Dict[str, Optional[str]], limit: int
+    ) -> Tuple[int, bool, List[Tuple[float, str, object]]]:
+        terms, phrases = self.parse_query(query)
+        lists: List[Dict] = []
+        for term in terms:
+            bucket = self.postings.get(term)
+            if bucket is None:
+                return 0, False, []
+            lists.append(bucket)
+        for name, value in filters.items():
+            if not value:
+                continue
+            bucket = self.facets.get((name, value.lower()))
+            if bucket is None:
+                return 0, False, []
+            lists.append(bucket)
+        if not lists:
+            return 0, False, []
+
+        lists.sort(key=len)
+        base, rest = lists[0], lists[1:]
+        # Only the newest max_scan keys of the rarest list are considered; intersecting them with
+        # the other lists is done with set operations rather than a per-key Python loop.
+        window = list(itertools.islice(reversed(base), self.max_scan))
+        truncated = len(window) < len(base)
+        if rest:
+            matched = set(window)
+            for other in rest:
+                matched = other.keys() & matched
+            window = [key for key in window if key in matched]
+        if phrases and len(window) > self.max_phrase_checks:
+            window = window[: self.max_phrase_checks]
+            truncated = True
+        candidates: List[str] = []
+        for key in window:
+            if len(candidates) >= self.max_candidates:
+                truncated = True
+                break
+            if phrases and not all(self.matches_phrase(key, p) for p in phrases):
+                continue
+            candidates.append(key)
 
-def extract_headline(text: str) -> str:
-    for line in text.splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        if line.lower().startswith("headline:"):
-            line = line.split(":", 1)[1].strip()
-        return line[:120]
-    text = text.strip()
-    return text[:120] if text else "No headline"
+        n_docs = len(self.docs)
+        avg_len = (self.total_length / n_docs) if n_docs else 1.0
+        idf = {
+            term: math.log(1.0 + (n_docs - len(self.postings[term]) + 0.5) / (len(self.postings[term]) + 0.5))
+            for term in terms
+        }
+        scored: List[Tuple[float, int, str]] = []
+        for rank, key in enumerate(candidates):
+            length = self.docs[key][0]
+            norm = self.k1 * (1.0 - self.b + self.b * length / (avg_len or 1.0))
+            score = 0.0
+            for term in terms:
+                tf = len(self.postings[term][key])
+                score += idf[term] * tf * (self.k1 + 1.0) / (tf + norm)
+            # Negative rank breaks ties in favour of newer docs.
+            scored.append((score, -rank, key))
+        top = heapq.nlargest(limit, scored)
+        return len(candidates), truncated, [(score, key, self.docs[key][3]) for score, _, key in top]
 
 
 # -----------------------------------------
-# Claude call (agent side)
+# Per-persona research relevance
 # -----------------------------------------
-async def claude_generate(system: str, user: str, price_hint: float, profile: Dict[str, str]) -> str:
-    if not ANTHROPIC_API_KEY:
-        return build_stub_note(price_hint, profile)
-
-    url = "https://api.anthropic.com/v1/messages"
-    headers = {
-        "x-api-key": ANTHROPIC_API_KEY,
-        "anthropic-version": "2023-06-01",
-        "content-type": "application/json",
-    }
-    payload = {
-        "model": MODEL_NAME,
-        "max_tokens": 420,
-        "system": system,
-        "messages": [{"role": "user", "content": user}],
-    }
-
-    try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            r = await client.post(url, headers=headers, json=payload)
-            r.raise_for_status()
-            data = r.json()
-    except httpx.HTTPStatusError as exc:
-        detail = exc.response.text if exc.response is not None else ""
-        print(f"[{AGENT_NAME}] Claude HTTP {exc.response.status_code if exc.response else 'error'}: {detail[:500]}")
-        return build_stub_note(price_hint, profile)
-    except Exception as exc:
-        print(f"[{AGENT_NAME}] Claude error: {type(exc).__name__}: {exc}")
-        return build_stub_note(price_hint, profile)
-
-    blocks = data.get("content", [])
-    text_parts = []
-    for b in blocks:
-        if b.get("type") == "text":
-            text_parts.append(b.get("text", ""))
-
-    return ("\n".join(text_parts)).strip() or "(no text)"
-
-
-def build_stub_note(price_hint: float, profile: Dict[str, str]) -> str:
-    bias = random.choice(["Long", "Short", "Neutral"])
-    conf = random.randint(45, 72)
-    decision = "Hold (paper): wait for confirmation"
-    if bias != "Neutral":
-        decision = f"Enter (paper): {bias} ~{random.randint(1, 8)} shares"
-    stop = f"{price_hint * (0.995 if bias == 'Long' else 1.005):.2f}"
-    headline = f"{profile['role']} watching {price_hint:.2f} for cleaner push"
-    setup = f"{profile['interests']} while price drifts; waiting for confirmation."
-    risk = f"Invalidate if price breaks {stop}; trim size if chop persists."
-    return (
-        f"Headline: {headline}\n"
-        f"Bias: {bias}\n"
-        f"Setup: {setup}\n"
-        f"Decision (paper): {decision}\n"
-        f"Risk: {risk}\n"
-        f"Confidence: {conf}%"
+def profile_terms(profile: Dict[str, str]) -> Set[str]:
+    text = " ".join(
+        [profile["role"], profile["focus"], profile["interests"], ROLE_KEYWORDS.get(profile["role"], "")]
     )
+    return {stem(t) for t in tokenize(text) if t not in SEARCH_STOPWORDS}
+
+
+def rank_research_for_profile(
+    items: List[ResearchItem], profile: Dict[str, str], limit: int
+) -> List[ResearchItem]:
+    if not items:
+        return []
+    terms = profile_terms(profile)
+    top_score = math.log1p(max(max(item.score or 0, 0) for item in items)) or 1.0
+    newest = max(item.ts for item in items)
+    scored: List[Tuple[float, int, ResearchItem]] = []
+    for i, item in enumerate(items):
+        words = {stem(t) for t in tokenize(item.title)}
+        overlap = len(words & terms)
+        popularity = math.log1p(max(item.score or 0, 0)) / top_score
+        age_hours = max(newest - item.ts, 0.0) / 3600.0
+        recency = 1.0 / (1.0 + age_hours / 12.0)
+        relevance = overlap + 0.6 * popularity + 0.3 * recency + 0.1 * math.log(item.cluster_size)
+        scored.append((relevance, -i, item))
+    return [item for _, _, item in heapq.nlargest(limit, scored)]
+
+
+# -----------------------------------------
+# Portfolio + risk engine
+# -----------------------------------------
+BREACH_MARGIN = 1
+BREACH_LEVERAGE = 2
+BREACH_DRAWDOWN = 4
+BREACH_LABELS = [(BREACH_MARGIN, "margin"), (BREACH_LEVERAGE, "leverage"), (BREACH_DRAWDOWN, "drawdown")]
+
+
+def breach_labels(flags: int) -> List[str]:
+    return [label for bit, label in BREACH_LABELS if flags & bit]
+
+
+class BookMetrics(NamedTuple):
+    equity: np.ndarray
+    gross: np.ndarray
+    net: np.ndarray
+    margin: np.ndarray
+    drawdown: np.ndarray
+    peak: np.ndarray
+    flags: np.ndarray
+
+
+class PortfolioBook:
+    # Agent books as dense arrays (agents x symbols) so one price tick revalues every agent in a
+    # single vectorized pass. Rows are allocated in doubling chunks as agents join.
+
+    def __init__(self, symbols: List[str], start_cash: float, capacity: int = 64) -> None:
+        self.start_cash = start_cash
+        self.symbols: List[str] = []
+        self.symbol_index: Dict[str, int] = {}
+        self.agent_names: List[str] = []
+        self.agent_index: Dict[str, int] = {}
+        self.cash = np.zeros(capacity)
+        self.qty = np.zeros((capacity, 0))
+        self.peak = np.zeros(capacity)
+        self.flags = np.zeros(capacity, dtype=np.int8)
+        self.prices = np.zeros(0)
+        for symbol in symbols:
+            self.add_symbol(symbol)
+        self.revalue()
+
+    def __len__(self) -> int:
+        return len(self.agent_names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.agent_index
+
+    def add_symbol(self, symbol: str, mark: float = 0.0) -> int:
+        if symbol in self.symbol_index:
+            return self.symbol_index[symbol]
+        self.symbol_index[symbol] = len(self.symbols)
+        self.symbols.append(symbol)
+        self.qty = np.hstack([self.qty, np.zeros((self.qty.shape[0], 1))])
+        self.prices = np.append(self.prices, mark)
+        return self.symbol_index[symbol]
+
+    def add_agent(self, name: str) -> int:
+        if name in self.agent_index:
+            return self.agent_index[name]
+        idx = len(self.agent_names)
+        if idx >= self.cash.shape[0]:
+            grow = max(self.cash.shape[0], 1)
+            self.cash = np.concatenate([self.cash, np.zeros(grow)])
+            self.qty = np.vstack([self.qty, np.zeros((grow, self.qty.shape[1]))])
+            self.peak = np.concatenate([self.peak, np.zeros(grow)])
+            self.flags = np.concatenate([self.flags, np.zeros(grow, dtype=np.int8)])
+        self.cash[idx] = self.start_cash
+        self.peak[idx] = self.start_cash
+        self.agent_index[name] = idx
+        self.agent_names.append(name)
+        return idx
+
+    def set_marks(self, marks: Dict[str, float]) -> None:
+        for symbol, mark in marks.items():
+            self.prices[self.add_symbol(symbol)] = mark
+
+    def position(self, name: str, symbol: str) -> float:
+        return float(self.qty[self.agent_index[name], self.symbol_index[symbol]])
+
+    def cash_of(self, name: str) -> float:
+        return float(self.cash[self.agent_index[name]])
+
+    def measure(self, qty: np.ndarray, cash: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        value = qty * self.prices
+        net = value.sum(axis=1)
+        gross = np.abs(value).sum(axis=1)
+        return cash + net, gross, net
+
+    def metrics(self) -> BookMetrics:
+        # Side-effect free, so read routes can call it from the threadpool at any time.
+        n = len(self.agent_names)
+        equity, gross, net = self.measure(self.qty[:n], self.cash[:n])
+        peak = np.maximum(self.peak[:n], equity)
+        drawdown = 1.0 - np.divide(equity, peak, out=np.ones_like(equity), where=peak > 0)
+        margin = RISK_MAINT_MARGIN_PCT * gross
+        flags = (
+            np.where(equity < margin, BREACH_MARGIN, 0)
+            | np.where(gross > RISK_MAX_LEVERAGE * np.maximum(equity, 0.0), BREACH_LEVERAGE, 0)
+            | np.where(drawdown * 100.0 > RISK_MAX_DRAWDOWN_PCT, BREACH_DRAWDOWN, 0)
+        ).astype(np.int8)
+        return BookMetrics(equity, gross, net, margin, drawdown, peak, flags)
+
+    def revalue(self) -> np.ndarray:
+        # Commits peaks and breach flags; only the price tick calls this. Returns row indices of
+        # agents that newly breached a limit on this pass.
+        m = self.metrics()
+        n = len(m.flags)
+        fresh = np.nonzero(m.flags & ~self.flags[:n])[0]
+        self.peak[:n] = m.peak
+        self.flags[:n] = m.flags
+        return fresh
+
+    def check_orders(
+        self, agent_rows: np.ndarray, symbol_cols: np.ndarray, dq: np.ndarray, fill: np.ndarray
+    ) -> np.ndarray:
+        # Pre-trade check for a batch of signed orders (positive = buy). All orders from the same
+        # agent are evaluated together and accepted or rejected as a group.
+        if len(agent_rows) == 0:
+            return np.zeros(0, dtype=bool)
+        touched, local = np.unique(agent_rows, return_inverse=True)
+        qty = self.qty[touched].copy()
+        cash = self.cash[touched].copy()
+        np.add.at(qty, (local, symbol_cols), dq)
+        np.add.at(cash, local, -dq * fill)
+        equity, gross, _ = self.measure(qty, cash)
+        _, gross_before, _ = self.measure(self.qty[touched], self.cash[touched])
+        # Orders that don't raise gross exposure are always allowed (so breached agents can cover);
+        # anything that adds exposure must pass the limits and is blocked during a drawdown breach.
+        reduces = gross <= gross_before
+        in_drawdown = (self.flags[touched] & BREACH_DRAWDOWN) != 0
+        within = (gross <= RISK_MAX_LEVERAGE * equity) & (equity >= RISK_MAINT_MARGIN_PCT * gross)
+        ok = (equity > 0) & (reduces | (within & ~in_drawdown))
+        return ok[local]
+
+    def apply_orders(self, agent_rows: np.ndarray, symbol_cols: np.ndarray, dq: np.ndarray, fill: np.ndarray) -> None:
+        np.add.at(self.qty, (agent_rows, symbol_cols), dq)
+        np.add.at(self.cash, agent_rows, -dq * fill)
+
+
+# -----------------------------------------
+# Secondary indexes (per agent / side / reply)
+# -----------------------------------------
+class OrderedBucket:
+    # Parallel id/ts/item lists in insertion order. Ids and timestamps only grow, so a page is
+    # two bisects plus a slice; evictions advance `head` and the dead prefix is compacted lazily.
+    __slots__ = ("ids", "ts", "items", "head")
+
+    def __init__(self) -> None:
+        self.ids: List[int] = []
+        self.ts: List[float] = []
+        self.items: List[object] = []
+        self.head = 0
+
+    def __len__(self) -> int:
+        return len(self.ids) - self.head
+
+    def append(self, item_id: int, ts: float, item: object) -> None:
+        self.ids.append(item_id)
+        self.ts.append(ts)
+        self.items.append(item)
+
+    def evict_through(self, item_id: int) -> None:
+        self.head = bisect.bisect_right(self.ids, item_id, self.head)
+        if self.head >= 1024 and self.head * 2 >= len(self.ids):
+            del self.ids[: self.head], self.ts[: self.head], self.items[: self.head]
+            self.head = 0
+
+    def page(
+        self, before_id: Optional[int], since: Optional[float], until: Optional[float], limit: int
+    ) -> Tuple[List[object], Optional[int]]:
+        lo, hi = self.head, len(self.ids)
+        if before_id is not None:
+            hi = bisect.bisect_left(self.ids, before_id, lo, hi)
+        if until is not None:
+            hi = bisect.bisect_right(self.ts, until, lo, hi)
+        if since is not None:
+            lo = bisect.bisect_left(self.ts, since, lo, hi)
+        start = max(lo, hi - limit)
+        out = self.items[start:hi]
+        out.reverse()
+        return out, (self.ids[start] if start > lo else None)
+
+
+class SecondaryIndex:
+    # key -> OrderedBucket. Items must be added in id order and evicted oldest-first, which is
+    # exactly how the room's post and trade stores grow and trim.
+
+    def __init__(self) -> None:
+        self.buckets: Dict[object, OrderedBucket] = {}
+
+    def add(self, key: object, item_id: int, ts: float, item: object) -> None:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = OrderedBucket()
+        bucket.append(item_id, ts, item)
+
+    def evict(self, key: object, item_id: int) -> None:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            return
+        bucket.evict_through(item_id)
+        if not bucket:
+            del self.buckets[key]
+
+    def count(self, key: object) -> int:
+        bucket = self.buckets.get(key)
+        return len(bucket) if bucket is not None else 0
+
+    def page(
+        self, key: object, before_id: Optional[int], since: Optional[float], until: Optional[float], limit: int
+    ) -> Tuple[List[object], Optional[int]]:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            return [], None
+        return bucket.page(before_id, since, until, limit)
+
+
+# -----------------------------------------
+# Scheduler
+# -----------------------------------------
+class TimerWheel:
+    # Hashed timing wheel: a single task on the event loop drives every room's periodic work,
+    # so adding a room costs one slot entry rather than another sleeping task.
+
+    def __init__(self, resolution: float = 0.05, slots: int = 512) -> None:
+        self.resolution = max(resolution, 0.001)
+        self.slots: List[List[Tuple[int, Callable[[], None]]]] = [[] for _ in range(slots)]
+        self.ticks = 0
+
+    def schedule(self, delay: float, callback: Callable[[], None]) -> None:
+        due = self.ticks + max(1, int(math.ceil(delay / self.resolution)))
+        self.slots[due % len(self.slots)].append((due, callback))
+
+    def advance(self) -> None:
+        self.ticks += 1
+        slot = self.slots[self.ticks % len(self.slots)]
+        if not slot:
+            return
+        ready = [cb for due, cb in slot if due <= self.ticks]
+        slot[:] = [(due, cb) for due, cb in slot if due > self.ticks]
+        for cb in ready:
+            try:
+                cb()
+            except Exception as exc:
+                print(f"[timer] callback error: {type(exc).__name__}: {exc}")
+
+    async def run(self) -> None:
+        start = time.monotonic() - self.ticks * self.resolution
+        while True:
+            delay = start + (self.ticks + 1) * self.resolution - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.advance()
 
 
 # -----------------------------------------
 # Hub state + helpers
 # -----------------------------------------
 if IS_HUB:
-    agents: List[str] = build_agent_list(AGENT_COUNT)
-    agent_profiles: Dict[str, Dict[str, str]] = {a: profile_for_agent(a) for a in agents}
-
-    posts: List[Post] = []
-    trades: List[Trade] = []
     research_items: List[ResearchItem] = []
     market_commodities: List[MarketItem] = []
     market_cryptos: List[MarketItem] = []
     market_updated_ts: float = 0.0
 
-    price: float = START_PRICE
-    positions: Dict[str, float] = {a: 0.0 for a in agents}
-    cash: Dict[str, float] = {a: float(START_CASH) for a in agents}
+    # Per-persona research ranking, keyed by (role, focus, interests). Rebuilt for every persona
+    # in every room on each research refresh and swapped in whole; only the loop writes it.
+    research_rank_cache: Dict[Tuple[str, str, str], List[ResearchItem]] = {}
 
-    next_post_id: int = 1
-    next_trade_id: int = 1
+    rooms: Dict[str, "Room"] = {}
+    timer_wheel = TimerWheel(resolution=TIMER_RESOLUTION_SECONDS)
+    hub_loop: Optional[asyncio.AbstractEventLoop] = None
 
-    price_history: List[Tuple[float, float]] = []  # (ts, price)
+    # Feed worker handles, kept here so the shutdown hook can stop whatever is currently running.
+    feed_proc: Optional[multiprocessing.Process] = None
+    feed_queue = None
+    feed_reader_thread: Optional[threading.Thread] = None
+    feed_task: Optional[asyncio.Task] = None
+    feed_lock = threading.Lock()
+    feeds_stopping = threading.Event()
 
 
-    def ensure_agent(name: str) -> None:
-        if name in positions:
-            return
-        agents.append(name)
-        positions[name] = 0.0
-        cash[name] = float(START_CASH)
-        agent_profiles[name] = profile_for_agent(name)
+    def persona_key(profile: Dict[str, str]) -> Tuple[str, str, str]:
+        return (profile["role"], profile["focus"], profile["interests"])
+
 
+    def rank_missing_personas(profiles) -> None:
+        # New rooms and agents can bring personas the last rebuild didn't cover.
+        for profile in profiles:
+            key = persona_key(profile)
+            if key not in research_rank_cache:
+                research_rank_cache[key] = rank_research_for_profile(research_items, profile, RESEARCH_SNAPSHOT_LIMIT)
 
-    def trim_list(items: List, max_len: int) -> None:
-        if len(items) > max_len:
-            del items[: len(items) - max_len]
 
+    def rebuild_research_rankings() -> None:
+        global research_rank_cache
+        ranked: Dict[Tuple[str, str, str], List[ResearchItem]] = {}
+        for room in list(rooms.values()):
+            for profile in room.agent_profiles.values():
+                key = persona_key(profile)
+                if key not in ranked:
+                    ranked[key] = rank_research_for_profile(research_items, profile, RESEARCH_SNAPSHOT_LIMIT)
+        research_rank_cache = ranked
 
-    def move_price() -> None:
-        global price
-        drift = 0.01
-        shock = random.gauss(0, 0.35)
-        price = max(1.0, price * (1 + (drift + shock) / 100.0))
-        price_history.append((time.time(), price))
-        if len(price_history) > 300:
-            del price_history[:100]
+
+    def trim_list(items: List, max_len: int) -> List:
+        if len(items) <= max_len:
+            return []
+        evicted = items[: len(items) - max_len]
+        del items[: len(items) - max_len]
+        return evicted
 
 
     def parse_bias(text: str) -> Optional[str]:
@@ -412,364 +799,333 @@ if IS_HUB:
         return None
 
 
-    def maybe_paper_trade(agent: str, note_text: str) -> None:
-        global next_trade_id
-        if random.random() > TRADE_CHANCE:
-            return
-
-        bias = parse_bias(note_text)
-        if bias in (None, "Neutral"):
-            return
-
-        side = "BUY" if bias == "Long" else "SELL"
-        qty = round(random.uniform(1, 10), 2)
-        p = price
-
-        if side == "BUY":
-            cost = qty * p
-            if cash[agent] < cost:
-                return
-            cash[agent] -= cost
-            positions[agent] += qty
-        else:
-            if positions[agent] < qty:
+    class Room:
+        # One isolated simulation: its own price path, roster, books, forum and wake events.
+        # Shared feeds (research, markets) live at hub level and are fanned out to every room.
+
+        def __init__(self, room_id: str, config: RoomConfig) -> None:
+            self.id = room_id
+            self.config = config
+            self.created_ts = time.time()
+            self.closed = False
+
+            self.agents: List[str] = list(config.agent_list or build_agent_list(config.agent_count))
+            self.agent_profiles: Dict[str, Dict[str, str]] = {a: profile_for_agent(a) for a in self.agents}
+            rank_missing_personas(self.agent_profiles.values())
+
+            self.posts: List[Post] = []
+            self.trades: List[Trade] = []
+            self.posts_by_id: Dict[int, Post] = {}
+            self.posts_by_agent = SecondaryIndex()
+            self.replies = SecondaryIndex()
+            self.trades_by_agent = SecondaryIndex()  # agent and (agent, side)
+            self.trades_by_side = SecondaryIndex()  # BUY / SELL, plus "*" for every trade
+
+            self.price: float = config.start_price
+            self.book = PortfolioBook([SIM_SYMBOL], config.start_cash, capacity=max(len(self.agents), 64))
+            self.book.set_marks({SIM_SYMBOL: self.price})
+            for name in self.agents:
+                self.book.add_agent(name)
+
+            self.next_post_id: int = 1
+            self.next_trade_id: int = 1
+
+            self.price_history: List[Tuple[float, float]] = [(time.time(), self.price)]  # (ts, price)
+
+            self.search_index = SearchIndex()
+            for item in research_items:
+                self.index_research(item)
+
+            # Wake events for event-driven agents: (seq, kind, agent, post_id). Price moves are not
+            # stored; every tick just signals waiters, which compare against their own reference price.
+            self.wake_events: deque = deque(maxlen=WAKE_EVENT_BACKLOG)
+            self.wake_seq: int = 0
+            self.wake_signal: Optional[asyncio.Event] = None
+
+        # Grows the book's arrays, so it must run on the loop (async routes only).
+        def ensure_agent(self, name: str) -> None:
+            if name in self.book:
                 return
-            positions[agent] -= qty
-            cash[agent] += qty * p
-
-        trades.append(
-            Trade(
-                id=next_trade_id,
-                ts=time.time(),
-                agent=agent,
-                side=side,
-                qty=qty,
-                price=p,
+            self.agents.append(name)
+            self.book.add_agent(name)
+            self.agent_profiles[name] = profile_for_agent(name)
+            rank_missing_personas([self.agent_profiles[name]])
+
+        def notify_waiters(self) -> None:
+            fired = self.wake_signal
+            self.wake_signal = asyncio.Event()
+            if fired is not None:
+                fired.set()
+
+        def record_wake(self, kind: str, agent: Optional[str], post_id: Optional[int]) -> None:
+            self.wake_seq += 1
+            self.wake_events.append((self.wake_seq, kind, agent, post_id))
+            self.notify_waiters()
+
+        # Sync routes run in the threadpool, so all wake state is touched on the loop thread only.
+        def signal_wake(self) -> None:
+            if hub_loop is not None:
+                hub_loop.call_soon_threadsafe(self.notify_waiters)
+
+        def publish_wake(self, kind: str, agent: Optional[str] = None, post_id: Optional[int] = None) -> None:
+            if hub_loop is not None:
+                hub_loop.call_soon_threadsafe(self.record_wake, kind, agent, post_id)
+
+        def pending_wake_events(
+            self, agent: str, since: int, ref_price: Optional[float], price_pct: float
+        ) -> List[WakeEvent]:
+            out: List[WakeEvent] = []
+            for seq, kind, target, post_id in reversed(self.wake_events):
+                if seq <= since:
+                    break
+                if kind == "research" or target == agent:
+                    out.append(WakeEvent(seq=seq, kind=kind, post_id=post_id))
+            out.reverse()
+            if ref_price and abs(self.price / ref_price - 1.0) * 100.0 >= price_pct:
+                out.append(WakeEvent(seq=self.wake_seq, kind="price"))
+            return out
+
+        def index_post(self, post: Post) -> None:
+            self.search_index.add(
+                f"post:{post.id}",
+                post.text,
+                {"kind": "post", "agent": post.agent, "bias": parse_bias(post.text)},
+                post,
             )
-        )
-        next_trade_id += 1
-        trim_list(trades, MAX_TRADES)
-
-    def normalize_reddit_url(url: str, permalink: str) -> str:
-        if url:
-            return url
-        if permalink:
-            return f"https://www.reddit.com{permalink}"
-        return "https://www.reddit.com"
-
-    def commodity_label(symbol: str) -> str:
-        labels = {
-            "GC=F": "Gold",
-            "SI=F": "Silver",
-            "CL=F": "WTI Crude",
-            "BZ=F": "Brent Crude",
-            "HG=F": "Copper",
-            "NG=F": "Nat Gas",
-        }
-        return labels.get(symbol, symbol)
-
-    def build_reddit_item(subreddit: str, data: Dict) -> Optional[ResearchItem]:
-        if not data:
-            return None
-        if data.get("over_18") and not RESEARCH_ALLOW_NSFW:
-            return None
-        title = (data.get("title") or "").strip()
-        if not title:
-            return None
-        permalink = (data.get("permalink") or "").strip()
-        url = normalize_reddit_url(
-            (data.get("url_overridden_by_dest") or data.get("url") or "").strip(), permalink
-        )
-        item_id = data.get("name") or data.get("id") or f"{subreddit}:{hash(title)}"
-        ts = float(data.get("created_utc") or time.time())
-        score = data.get("score")
-        return ResearchItem(
-            id=f"reddit:{item_id}",
-            ts=ts,
-            source="reddit",
-            title=title,
-            url=url,
-            score=score,
-            subreddit=subreddit,
-        )
 
-    async def fetch_reddit_items(client: httpx.AsyncClient) -> List[ResearchItem]:
-        if not REDDIT_SUBREDDITS:
-            return []
-        items: List[ResearchItem] = []
-        for subreddit in REDDIT_SUBREDDITS:
-            url = f"https://www.reddit.com/r/{subreddit}/{REDDIT_MODE}.json?limit={REDDIT_LIMIT}"
+        def index_research(self, item: ResearchItem) -> None:
+            self.search_index.add(
+                f"research:{item.id}",
+                item.title,
+                {"kind": "research", "source": item.source, "subreddit": item.subreddit},
+                item,
+            )
+
+        def append_post(self, post: Post) -> None:
+            self.posts.append(post)
+            self.posts_by_id[post.id] = post
+            self.posts_by_agent.add(post.agent, post.id, post.ts, post)
+            if post.reply_to is not None:
+                self.replies.add(post.reply_to, post.id, post.ts, post)
+            self.index_post(post)
+            for old in trim_list(self.posts, self.config.max_posts):
+                del self.posts_by_id[old.id]
+                self.posts_by_agent.evict(old.agent, old.id)
+                if old.reply_to is not None:
+                    self.replies.evict(old.reply_to, old.id)
+                self.search_index.remove(f"post:{old.id}")
+
+        def append_trade(self, trade: Trade) -> None:
+            self.trades.append(trade)
+            self.trades_by_agent.add(trade.agent, trade.id, trade.ts, trade)
+            self.trades_by_agent.add((trade.agent, trade.side), trade.id, trade.ts, trade)
+            self.trades_by_side.add(trade.side, trade.id, trade.ts, trade)
+            self.trades_by_side.add("*", trade.id, trade.ts, trade)
+            for old in trim_list(self.trades, self.config.max_trades):
+                self.trades_by_agent.evict(old.agent, old.id)
+                self.trades_by_agent.evict((old.agent, old.side), old.id)
+                self.trades_by_side.evict(old.side, old.id)
+                self.trades_by_side.evict("*", old.id)
+
+        def system_post(self, text: str) -> None:
+            self.append_post(Post(id=self.next_post_id, ts=time.time(), agent="SYSTEM", text=text))
+            self.next_post_id += 1
+
+        def research_for_agent(self, agent: str) -> List[ResearchItem]:
+            # Pure lookup; unknown agents (never snapshotted) get the unranked feed.
+            profile = self.agent_profiles.get(agent) or profile_for_agent(agent)
+            ranked = research_rank_cache.get(persona_key(profile))
+            if ranked is None:
+                return research_items[:RESEARCH_SNAPSHOT_LIMIT]
+            return ranked
+
+        def move_price(self) -> None:
+            drift = self.config.price_drift_pct
+            shock = random.gauss(0, self.config.price_vol_pct)
+            self.price = max(1.0, self.price * (1 + (drift + shock) / 100.0))
+            self.price_history.append((time.time(), self.price))
+            if len(self.price_history) > 300:
+                del self.price_history[:100]
+            self.book.set_marks({SIM_SYMBOL: self.price})
+            for row in self.book.revalue():
+                self.publish_wake("risk", self.book.agent_names[row])
+            self.signal_wake()
+
+        def tick(self) -> None:
+            if self.closed:
+                return
             try:
-                r = await client.get(url)
-                r.raise_for_status()
-                payload = r.json()
-            except Exception as exc:
-                print(f"[research] reddit fetch failed for r/{subreddit}: {type(exc).__name__}: {exc}")
-                continue
+                self.move_price()
+            except Exception as e:
+                self.system_post(f"Price loop error: {type(e).__name__}: {e}")
+            timer_wheel.schedule(self.config.price_tick_seconds, self.tick)
 
-            for child in payload.get("data", {}).get("children", []):
-                if child.get("kind") != "t3":
-                    continue
-                item = build_reddit_item(subreddit, child.get("data") or {})
-                if item:
-                    items.append(item)
+        def maybe_paper_trade(self, agent: str, note_text: str) -> None:
+            if random.random() > self.config.trade_chance:
+                return
 
-        items.sort(key=lambda x: ((x.score or 0), x.ts), reverse=True)
-        return items[:RESEARCH_MAX_ITEMS]
+            bias = parse_bias(note_text)
+            if bias in (None, "Neutral"):
+                return
 
-    async def fetch_commodities(client: httpx.AsyncClient) -> List[MarketItem]:
-        if not COMMODITY_SYMBOLS:
-            return []
-        url = "https://query1.finance.yahoo.com/v7/finance/quote"
-        params = {"symbols": ",".join(COMMODITY_SYMBOLS)}
-        r = await client.get(url, params=params)
-        r.raise_for_status()
-        payload = r.json()
-        results = payload.get("quoteResponse", {}).get("result", [])
-        items: List[MarketItem] = []
-        for row in results:
-            symbol = row.get("symbol")
-            price = row.get("regularMarketPrice")
-            change_pct = row.get("regularMarketChangePercent")
-            if symbol is None or price is None or change_pct is None:
-                continue
-            items.append(
-                MarketItem(
-                    id=f"yahoo:{symbol}",
-                    label=commodity_label(symbol),
-                    symbol=symbol,
-                    price=float(price),
-                    change_pct=float(change_pct),
-                    source="yahoo",
-                )
-            )
-        return items
-
-    async def fetch_cryptos(client: httpx.AsyncClient) -> List[MarketItem]:
-        url = "https://api.coingecko.com/api/v3/coins/markets"
-        params = {
-            "vs_currency": "usd",
-            "order": "market_cap_desc",
-            "per_page": CRYPTO_LIMIT,
-            "page": 1,
-            "sparkline": "true",
-            "price_change_percentage": "24h,7d",
-        }
-        headers = {}
-        if COINGECKO_API_KEY and COINGECKO_API_HEADER:
-            headers[COINGECKO_API_HEADER] = COINGECKO_API_KEY
-        r = await client.get(url, params=params, headers=headers)
-        r.raise_for_status()
-        payload = r.json()
-        items: List[MarketItem] = []
-        for row in payload:
-            price = row.get("current_price")
-            change_pct = row.get("price_change_percentage_24h")
-            change_pct_7d = row.get("price_change_percentage_7d_in_currency")
-            sparkline = None
-            spark = row.get("sparkline_in_7d")
-            if isinstance(spark, dict):
-                sparkline = spark.get("price")
-            if price is None or change_pct is None:
-                continue
-            items.append(
-                MarketItem(
-                    id=f"cg:{row.get('id')}",
-                    label=row.get("name") or row.get("symbol", "").upper(),
-                    symbol=(row.get("symbol") or "").upper(),
-                    price=float(price),
-                    change_pct=float(change_pct),
-                    change_pct_7d=float(change_pct_7d) if change_pct_7d is not None else None,
-                    sparkline=sparkline,
-                    source="coingecko",
+            side = "BUY" if bias == "Long" else "SELL"
+            qty = round(random.uniform(1, 10), 2)
+            p = self.price
+
+            book = self.book
+            rows = np.array([book.agent_index[agent]])
+            cols = np.array([book.symbol_index[SIM_SYMBOL]])
+            dq = np.array([qty if side == "BUY" else -qty])
+            fill = np.array([p])
+            if not book.check_orders(rows, cols, dq, fill)[0]:
+                return
+            book.apply_orders(rows, cols, dq, fill)
+
+            self.append_trade(
+                Trade(
+                    id=self.next_trade_id,
+                    ts=time.time(),
+                    agent=agent,
+                    side=side,
+                    qty=qty,
+                    price=p,
                 )
             )
-        return items
+            self.next_trade_id += 1
+
+
+    def create_room(room_id: str, config: RoomConfig) -> Room:
+        room = Room(room_id, config)
+        rooms[room_id] = room
+        room.system_post("System online. Agents will begin posting shortly.")
+        if hub_loop is not None:
+            hub_loop.call_soon_threadsafe(room.notify_waiters)
+        timer_wheel.schedule(config.price_tick_seconds, room.tick)
+        return room
+
+
+    def get_room(room_id: str) -> Room:
+        room = rooms.get(room_id)
+        if room is None:
+            raise HTTPException(status_code=404, detail=f"unknown room: {room_id}")
+        return room
+
+
+    def replace_research(new_items: List[ResearchItem]) -> None:
+        global research_items
+        keep = {item.id for item in new_items}
+        previous = {item.id for item in research_items}
+        removed = [f"research:{old.id}" for old in research_items if old.id not in keep]
+        research_items = list(new_items)
+        rebuild_research_rankings()
+        for room in list(rooms.values()):
+            for key in removed:
+                room.search_index.remove(key)
+            for item in new_items:
+                room.index_research(item)
+            if keep - previous:
+                room.publish_wake("research")
+
+    # Feed results arrive as (kind, msgpack bytes), either from the worker process or, with
+    # FEED_WORKER_ENABLED=0, from feed tasks on this loop. Decoding happens on the reader
+    # thread; only the final swap into hub state runs on the event loop.
+    def decode_feed(kind: str, raw: bytes):
+        body = msgpack.unpackb(raw, raw=False)
+        if kind == "research":
+            return unpack_research(body)
+        return (
+            unpack_markets(body["commodities"]) if body["commodities"] else None,
+            unpack_markets(body["cryptos"]) if body["cryptos"] else None,
+            body["updated_ts"],
+        )
 
-    async def research_loop() -> None:
-        if not RESEARCH_ENABLED:
-            return
-        headers = {"User-Agent": RESEARCH_USER_AGENT}
-        async with httpx.AsyncClient(timeout=20, headers=headers) as client:
-            while True:
-                try:
-                    new_items = await fetch_reddit_items(client)
-                    if new_items:
-                        research_items[:] = new_items
-                except Exception as exc:
-                    print(f"[research] loop error: {type(exc).__name__}: {exc}")
-                await asyncio.sleep(RESEARCH_TICK_SECONDS)
-
-    async def market_loop() -> None:
+
+    def apply_feed(kind: str, payload) -> None:
         global market_commodities, market_cryptos, market_updated_ts
-        if not MARKET_FEED_ENABLED:
+        if kind == "research":
+            replace_research(payload)
             return
-        headers = {"User-Agent": "daytrader-agents/0.1"}
-        async with httpx.AsyncClient(timeout=20, headers=headers) as client:
-            while True:
-                try:
-                    commodities = await fetch_commodities(client)
-                    cryptos = await fetch_cryptos(client)
-                    if commodities:
-                        market_commodities = commodities
-                    if cryptos:
-                        market_cryptos = cryptos
-                    if commodities or cryptos:
-                        market_updated_ts = time.time()
-                except Exception as exc:
-                    print(f"[markets] loop error: {type(exc).__name__}: {exc}")
-                await asyncio.sleep(MARKET_REFRESH_SECONDS)
-
-    async def price_loop() -> None:
-        global next_post_id
-        while True:
-            try:
-                move_price()
-            except Exception as e:
-                posts.append(
-                    Post(
-                        id=next_post_id,
-                        ts=time.time(),
-                        agent="SYSTEM",
-                        text=f"Price loop error: {type(e).__name__}: {e}",
-                    )
-                )
-                next_post_id += 1
-            await asyncio.sleep(PRICE_TICK_SECONDS)
-
-
-# -----------------------------------------
-# Agent logic
-# -----------------------------------------
-async def fetch_snapshot(client: httpx.AsyncClient) -> SnapshotOut:
-    params = {"agent": AGENT_NAME, "limit_posts": 40, "limit_prices": 20}
-    r = await client.get(f"{HUB_URL}/api/snapshot", params=params)
-    r.raise_for_status()
-    data = r.json()
-    return SnapshotOut(**data)
-
-
-def summarize_posts(posts_in: List[Post], limit: int = 8) -> str:
-    if not posts_in:
-        return "(none)"
-    lines = []
-    for p in posts_in[-limit:]:
-        headline = extract_headline(p.text)
-        lines.append(f"- [{p.id}] {p.agent}: {headline}")
-    return "\n".join(lines)
-
-def summarize_research(items: List[ResearchItem], limit: int = 8) -> str:
-    if not items:
-        return "(no research highlights yet)"
-    lines: List[str] = []
-    for item in items[:limit]:
-        score = f"{item.score}" if item.score is not None else "n/a"
-        sub = f"r/{item.subreddit}" if item.subreddit else "reddit"
-        lines.append(f"- {sub} ({score}): {item.title}")
-    return "\n".join(lines)
+        commodities, cryptos, updated_ts = payload
+        if commodities:
+            market_commodities = commodities
+        if cryptos:
+            market_cryptos = cryptos
+        market_updated_ts = updated_ts
 
 
-def pick_reply_target(posts_in: List[Post]) -> Optional[Post]:
-    if not posts_in or random.random() > REPLY_CHANCE:
-        return None
-    candidates = [p for p in posts_in[-12:] if p.agent != AGENT_NAME]
-    if not candidates:
-        return None
-    return random.choice(candidates)
+    def publish_feed(kind: str, raw: bytes) -> None:
+        apply_feed(kind, decode_feed(kind, raw))
 
 
-async def post_note(client: httpx.AsyncClient, text: str, reply_to: Optional[int]) -> None:
-    payload = {"agent": AGENT_NAME, "text": text, "reply_to": reply_to}
-    r = await client.post(f"{HUB_URL}/api/post", json=payload)
-    r.raise_for_status()
+    def spawn_feed_worker(ctx) -> None:
+        global feed_proc
+        with feed_lock:
+            if feeds_stopping.is_set():
+                return
+            feed_proc = ctx.Process(target=feeds.worker_main, args=(feed_queue,), name="feed-worker", daemon=True)
+            feed_proc.start()
 
 
-async def agent_loop() -> None:
-    profile = load_agent_profile(AGENT_NAME)
-    async with httpx.AsyncClient(timeout=30) as client:
-        while True:
+    def feed_reader(ctx) -> None:
+        while not feeds_stopping.is_set():
             try:
-                if random.random() <= AGENT_POST_CHANCE:
-                    snapshot = await fetch_snapshot(client)
-                    prices = snapshot.recent_prices or [snapshot.price]
-                    change = prices[-1] - prices[0]
-                    pct = (change / prices[0]) * 100 if prices[0] else 0.0
-                    hi = max(prices)
-                    lo = min(prices)
-
-                    reply_target = pick_reply_target(snapshot.posts)
-                    recent_posts_text = summarize_posts(snapshot.posts, limit=8)
-                    research_text = "(research not enabled)"
-                    if snapshot.research:
-                        research_text = summarize_research(snapshot.research, limit=8)
-
-                    system = (
-                        f"You are {AGENT_NAME}, a day-trading desk agent in a PAPER-trading sandbox.\n"
-                        f"ROLE: {profile['role']}\n"
-                        f"FOCUS: {profile['focus']}\n"
-                        f"INTERESTS: {profile['interests']}\n"
-                        f"STYLE: {profile['style']}\n\n"
-                        "Rules:\n"
-                        "- Paper trading only. Do NOT give real-world advice to a person.\n"
-                        "- Use the provided SIM data, recent posts, and research highlights only.\n"
-                        "- Speak like a desk note: concise, specific, actionable.\n"
-                        "- Always include risk controls: invalidation/stop idea + sizing.\n"
-                        "- Do not claim you personally browsed the web; use the highlights only.\n"
-                        "- Do NOT mention APIs, models, tokens, or that you are an AI.\n"
-                        "Return output in the exact format below, with all fields present."
-                    )
-
-                    user_lines = [
-                        "SIM MARKET SNAPSHOT:",
-                        f"- Current price: {snapshot.price:.2f}",
-                        f"- Recent range (last ~{len(prices)} pts): low {lo:.2f} / high {hi:.2f}",
-                        f"- Recent change: {change:+.2f} ({pct:+.2f}%)",
-                        "",
-                        "YOUR BOOK (paper):",
-                        f"- Position: {snapshot.position:.2f} shares",
-                        f"- Cash: {snapshot.cash:.2f}",
-                        "",
-                        "RECENT POSTS (newest last):",
-                        recent_posts_text,
-                        "",
-                        "RESEARCH HIGHLIGHTS (public chatter):",
-                        research_text,
-                    ]
-
-                    if reply_target:
-                        user_lines += [
-                            "",
-                            "REPLY TARGET:",
-                            f"Post ID {reply_target.id} by {reply_target.agent}:",
-                            reply_target.text,
-                            "",
-                            "Respond directly to the reply target before adding your own view.",
-                        ]
-                    else:
-                        user_lines += [
-                            "",
-                            "No required reply target. Add a fresh insight for the group.",
-                        ]
-
-                    user_lines += [
-                        "",
-                        "FORMAT (exact):",
-                        "Headline: <8-14 words, market-focused>",
-                        "Bias: Long | Short | Neutral",
-                        "Setup: <1-2 sentences describing what you see>",
-                        "Decision (paper): <Enter/Exit/Hold + side + rough size in shares>",
-                        "Risk: <stop/invalidation level idea + what would prove you wrong>",
-                        "Confidence: <0-100%>",
-                    ]
-
-                    user = "\n".join(user_lines)
-                    text = await claude_generate(system, user, snapshot.price, profile)
-                    await post_note(client, text, reply_target.id if reply_target else None)
-            except Exception as e:
-                print(f"[{AGENT_NAME}] error: {type(e).__name__}: {e}")
+                kind, raw = feed_queue.get(timeout=1)
+            except queue.Empty:
+                proc = feed_proc
+                if proc is not None and not proc.is_alive() and not feeds_stopping.is_set():
+                    print(f"[feeds] worker exited with code {proc.exitcode}; restarting")
+                    spawn_feed_worker(ctx)
+                continue
+            except (EOFError, OSError, ValueError):
+                return  # queue torn down: hub is shutting down
+            try:
+                payload = decode_feed(kind, raw)
+            except Exception as exc:
+                print(f"[feeds] bad {kind} payload: {type(exc).__name__}: {exc}")
+                continue
+            try:
+                hub_loop.call_soon_threadsafe(apply_feed, kind, payload)
+            except RuntimeError:
+                return  # event loop closed: hub is shutting down
 
-            sleep_for = max(1.0, AGENT_TICK_SECONDS + random.uniform(-AGENT_JITTER_SECONDS, AGENT_JITTER_SECONDS))
-            await asyncio.sleep(sleep_for)
+
+    def start_feeds() -> None:
+        global feed_queue, feed_reader_thread, feed_task
+        if not feeds.feeds_enabled():
+            return
+        feeds_stopping.clear()
+        if not FEED_WORKER_ENABLED:
+            feed_task = asyncio.create_task(feeds.run_feeds(publish_feed))
+            return
+        # spawn, not fork: the hub already has an event loop and threads running.
+        ctx = multiprocessing.get_context("spawn")
+        feed_queue = ctx.Queue()
+        spawn_feed_worker(ctx)
+        feed_reader_thread = threading.Thread(target=feed_reader, args=(ctx,), name="feed-reader", daemon=True)
+        feed_reader_thread.start()
+
+
+    def stop_feeds() -> None:
+        global feed_proc, feed_queue, feed_reader_thread, feed_task
+        feeds_stopping.set()
+        if feed_task is not None:
+            feed_task.cancel()
+            feed_task = None
+        with feed_lock:
+            proc, feed_proc = feed_proc, None
+        if proc is not None:
+            proc.terminate()
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.kill()
+                proc.join()
+        if feed_reader_thread is not None:
+            feed_reader_thread.join(timeout=5)
+            feed_reader_thread = None
+        if feed_queue is not None:
+            feed_queue.cancel_join_thread()
+            feed_queue.close()
+            feed_queue = None
 
 
 # -----------------------------------------
@@ -778,25 +1134,24 @@ async def agent_loop() -> None:
 @app.on_event("startup")
 async def on_startup():
     if IS_HUB:
-        global next_post_id
-        price_history.append((time.time(), price))
-        posts.append(
-            Post(
-                id=next_post_id,
-                ts=time.time(),
-                agent="SYSTEM",
-                text="System online. Agents will begin posting shortly.",
-            )
-        )
-        next_post_id += 1
-        asyncio.create_task(price_loop())
-        asyncio.create_task(research_loop())
-        asyncio.create_task(market_loop())
+        global hub_loop
+        hub_loop = asyncio.get_running_loop()
+        for room_id in ROOM_IDS:
+            if room_id not in rooms:
+                create_room(room_id, RoomConfig())
+        asyncio.create_task(timer_wheel.run())
+        start_feeds()
 
     if IS_AGENT:
         asyncio.create_task(agent_loop())
 
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    if IS_HUB:
+        stop_feeds()
+
+
 # -----------------------------------------
 # API routes
 # -----------------------------------------
@@ -806,11 +1161,62 @@ def health():
 
 
 if IS_HUB:
+    # Every room-scoped route is served at /api/rooms/{room_id}/... and, for the default room
+    # (or ?room_id=...), at the original /api/... path.
+    def room_out(room: Room) -> RoomOut:
+        return RoomOut(
+            id=room.id,
+            created_ts=room.created_ts,
+            price=room.price,
+            agent_count=len(room.agents),
+            post_count=len(room.posts),
+            trade_count=len(room.trades),
+            config=room.config,
+        )
+
+
+    @app.get("/api/rooms", response_model=List[RoomOut])
+    def list_rooms():
+        return [room_out(room) for room in list(rooms.values())]
+
+
+    # Room lifecycle runs on the event loop (async routes), like the timer wheel and feed updates.
+    @app.post("/api/rooms", response_model=RoomOut)
+    async def open_room(room_in: RoomIn):
+        room_id = room_in.id.strip()
+        if not ROOM_ID_RE.match(room_id):
+            raise HTTPException(status_code=400, detail="room id must be 1-64 chars of [A-Za-z0-9_-]")
+        if room_id in rooms:
+            raise HTTPException(status_code=409, detail=f"room already exists: {room_id}")
+        if len(rooms) >= MAX_ROOMS:
+            raise HTTPException(status_code=400, detail=f"room limit reached ({MAX_ROOMS})")
+        return room_out(create_room(room_id, room_in.config))
+
+
+    @app.get("/api/rooms/{room_id}", response_model=RoomOut)
+    def get_room_info(room_id: str):
+        return room_out(get_room(room_id))
+
+
+    @app.delete("/api/rooms/{room_id}")
+    async def close_room(room_id: str):
+        if room_id == DEFAULT_ROOM_ID:
+            raise HTTPException(status_code=400, detail="the default room cannot be closed")
+        room = get_room(room_id)
+        room.closed = True
+        del rooms[room_id]
+        room.notify_waiters()
+        return {"closed": room_id}
+
+
     @app.get("/api/config", response_model=ConfigOut)
-    def get_config():
+    @app.get("/api/rooms/{room_id}/config", response_model=ConfigOut)
+    def get_config(room_id: str = DEFAULT_ROOM_ID):
+        room = get_room(room_id)
         return ConfigOut(
-            agent_count=len(agents),
-            tick_seconds=PRICE_TICK_SECONDS,
+            room_id=room.id,
+            agent_count=len(room.agents),
+            tick_seconds=room.config.price_tick_seconds,
             max_posts_per_tick=1,
             model_name=MODEL_NAME,
             using_claude_api=bool(ANTHROPIC_API_KEY),
@@ -819,75 +1225,273 @@ if IS_HUB:
 
 
     @app.get("/api/state", response_model=StateOut)
-    def get_state(limit_posts: int = 200, limit_trades: int = 200):
-        return StateOut(
-            price=price,
-            posts=posts[-limit_posts:],
-            trades=trades[-limit_trades:],
+    @app.get("/api/rooms/{room_id}/state", response_model=StateOut)
+    def get_state(request: Request, room_id: str = DEFAULT_ROOM_ID, limit_posts: int = 200, limit_trades: int = 200):
+        room = get_room(room_id)
+        state = StateOut(
+            price=room.price,
+            posts=room.posts[-limit_posts:],
+            trades=room.trades[-limit_trades:],
         )
+        return negotiated(request, state)
 
 
     @app.get("/api/pnl", response_model=List[AgentPnL])
-    def get_pnl():
+    @app.get("/api/rooms/{room_id}/pnl", response_model=List[AgentPnL])
+    def get_pnl(room_id: str = DEFAULT_ROOM_ID):
+        book = get_room(room_id).book
+        m = book.metrics()
+        col = book.symbol_index[SIM_SYMBOL]
         out: List[AgentPnL] = []
-        for a in agents:
-            equity = cash[a] + positions[a] * price
-            out.append(AgentPnL(agent=a, cash=cash[a], position=positions[a], equity=equity))
-
-        out.sort(key=lambda x: x.equity, reverse=True)
-        return out[:25]
+        for row in np.argsort(-m.equity, kind="stable")[:25]:
+            out.append(
+                AgentPnL(
+                    agent=book.agent_names[row],
+                    cash=float(book.cash[row]),
+                    position=float(book.qty[row, col]),
+                    equity=float(m.equity[row]),
+                    gross_exposure=float(m.gross[row]),
+                    drawdown_pct=float(m.drawdown[row] * 100.0),
+                )
+            )
+        return out
+
+
+    @app.get("/api/risk", response_model=RiskOut)
+    @app.get("/api/rooms/{room_id}/risk", response_model=RiskOut)
+    def get_risk(room_id: str = DEFAULT_ROOM_ID, breached_only: bool = False, limit: int = 100):
+        book = get_room(room_id).book
+        m = book.metrics()
+        n = len(m.flags)
+        rows = np.nonzero(m.flags)[0] if breached_only else np.arange(n)
+        rows = rows[np.argsort(-m.gross[rows], kind="stable")][: max(limit, 0)]
+        out: List[AgentRisk] = []
+        for row in rows:
+            equity = float(m.equity[row])
+            gross = float(m.gross[row])
+            out.append(
+                AgentRisk(
+                    agent=book.agent_names[row],
+                    equity=equity,
+                    gross_exposure=gross,
+                    net_exposure=float(m.net[row]),
+                    margin_required=float(m.margin[row]),
+                    leverage=gross / equity if equity > 0 else None,
+                    drawdown_pct=float(m.drawdown[row] * 100.0),
+                    breaches=breach_labels(int(m.flags[row])),
+                )
+            )
+        return RiskOut(ts=time.time(), agents=out)
 
 
+    # async: the first snapshot for a new agent adds it to the book, which only the loop may write.
     @app.get("/api/snapshot", response_model=SnapshotOut)
-    def get_snapshot(agent: str, limit_posts: int = 40, limit_prices: int = 20):
+    @app.get("/api/rooms/{room_id}/snapshot", response_model=SnapshotOut)
+    async def get_snapshot(
+        request: Request, agent: str, room_id: str = DEFAULT_ROOM_ID, limit_posts: int = 40, limit_prices: int = 20
+    ):
         if not agent:
             raise HTTPException(status_code=400, detail="agent is required")
-        ensure_agent(agent)
-        recent_prices = [p for _, p in price_history[-limit_prices:]]
+        room = get_room(room_id)
+        room.ensure_agent(agent)
+        recent_prices = [p for _, p in room.price_history[-limit_prices:]]
         if not recent_prices:
-            recent_prices = [price]
-        research_slice = research_items[:RESEARCH_SNAPSHOT_LIMIT]
-        return SnapshotOut(
-            price=price,
+            recent_prices = [room.price]
+        research_slice = room.research_for_agent(agent)
+        snapshot = SnapshotOut(
+            price=room.price,
             recent_prices=recent_prices,
-            posts=posts[-limit_posts:],
-            position=positions[agent],
-            cash=cash[agent],
+            posts=room.posts[-limit_posts:],
+            position=room.book.position(agent, SIM_SYMBOL),
+            cash=room.book.cash_of(agent),
             research=research_slice,
         )
+        return negotiated(request, snapshot)
 
     @app.get("/api/research", response_model=List[ResearchItem])
-    def get_research():
+    @app.get("/api/rooms/{room_id}/research", response_model=List[ResearchItem])
+    def get_research(room_id: str = DEFAULT_ROOM_ID, agent: Optional[str] = None):
+        if agent:
+            return get_room(room_id).research_for_agent(agent)
         return research_items[:RESEARCH_SNAPSHOT_LIMIT]
 
+    @app.get("/api/wake", response_model=WakeOut)
+    @app.get("/api/rooms/{room_id}/wake", response_model=WakeOut)
+    async def wake(
+        agent: str,
+        room_id: str = DEFAULT_ROOM_ID,
+        since: Optional[int] = None,
+        ref_price: Optional[float] = None,
+        price_pct: float = AGENT_PRICE_TRIGGER_PCT,
+        timeout: float = 30,
+    ):
+        if not agent:
+            raise HTTPException(status_code=400, detail="agent is required")
+        room = get_room(room_id)
+        room.ensure_agent(agent)
+        if since is None:
+            since = room.wake_seq
+        deadline = time.monotonic() + max(0.0, min(timeout, WAKE_MAX_TIMEOUT))
+        while True:
+            signal = room.wake_signal
+            events = room.pending_wake_events(agent, since, ref_price, price_pct)
+            if events:
+                return WakeOut(seq=room.wake_seq, price=room.price, triggered=True, events=events)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or signal is None or room.closed:
+                return WakeOut(seq=room.wake_seq, price=room.price, triggered=False, events=[])
+            try:
+                await asyncio.wait_for(signal.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    # async so it runs on the loop with every index writer (posts, research swaps); queries are
+    # bounded by the scan/candidate caps, so they don't stall it.
+    @app.get("/api/search", response_model=SearchOut)
+    @app.get("/api/rooms/{room_id}/search", response_model=SearchOut)
+    async def search(
+        room_id: str = DEFAULT_ROOM_ID,
+        q: str = "",
+        agent: Optional[str] = None,
+        bias: Optional[str] = None,
+        subreddit: Optional[str] = None,
+        kind: Optional[str] = None,
+        limit: int = 20,
+    ):
+        room = get_room(room_id)
+        limit = max(1, min(limit, SEARCH_MAX_RESULTS))
+        filters = {"agent": agent, "bias": bias, "subreddit": subreddit, "kind": kind}
+        matched, truncated, results = room.search_index.search(q, filters, limit)
+        hits: List[SearchHit] = []
+        for score, key, obj in results:
+            if key.startswith("post:"):
+                hits.append(SearchHit(kind="post", score=score, post=obj))
+            else:
+                hits.append(SearchHit(kind="research", score=score, research=obj))
+        return SearchOut(query=q, matched=matched, truncated=truncated, hits=hits)
+
+    def page_limit(limit: int) -> int:
+        return max(1, min(limit, PAGE_MAX_LIMIT))
+
+    # Cursor pages run newest-first: pass next_before_id back as before_id for the next page.
+    # since/until bound post/trade timestamps (inclusive). Only history still held by the room
+    # (max_posts / max_trades) is reachable. The routes are async so pages read the indexes on
+    # the loop, where appends and evictions happen; each page is O(log n + limit).
+    @app.get("/api/agents/{name}/posts", response_model=PostPage)
+    @app.get("/api/rooms/{room_id}/agents/{name}/posts", response_model=PostPage)
+    async def get_agent_posts(
+        name: str,
+        room_id: str = DEFAULT_ROOM_ID,
+        before_id: Optional[int] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+    ):
+        room = get_room(room_id)
+        items, cursor = room.posts_by_agent.page(name, before_id, since, until, page_limit(limit))
+        return PostPage(items=items, next_before_id=cursor)
+
+    @app.get("/api/agents/{name}/trades", response_model=TradePage)
+    @app.get("/api/rooms/{room_id}/agents/{name}/trades", response_model=TradePage)
+    async def get_agent_trades(
+        name: str,
+        room_id: str = DEFAULT_ROOM_ID,
+        side: Optional[str] = None,
+        before_id: Optional[int] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+    ):
+        room = get_room(room_id)
+        key = (name, side.upper()) if side else name
+        items, cursor = room.trades_by_agent.page(key, before_id, since, until, page_limit(limit))
+        return TradePage(items=items, next_before_id=cursor)
+
+    @app.get("/api/trades", response_model=TradePage)
+    @app.get("/api/rooms/{room_id}/trades", response_model=TradePage)
+    async def get_trades(
+        room_id: str = DEFAULT_ROOM_ID,
+        side: Optional[str] = None,
+        before_id: Optional[int] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+    ):
+        room = get_room(room_id)
+        key = side.upper() if side else "*"
+        items, cursor = room.trades_by_side.page(key, before_id, since, until, page_limit(limit))
+        return TradePage(items=items, next_before_id=cursor)
+
+    @app.get("/api/posts/{post_id}/replies", response_model=PostPage)
+    @app.get("/api/rooms/{room_id}/posts/{post_id}/replies", response_model=PostPage)
+    async def get_replies(
+        post_id: int,
+        room_id: str = DEFAULT_ROOM_ID,
+        before_id: Optional[int] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+    ):
+        room = get_room(room_id)
+        items, cursor = room.replies.page(post_id, before_id, since, until, page_limit(limit))
+        return PostPage(items=items, next_before_id=cursor)
+
     @app.get("/api/markets", response_model=MarketsOut)
-    def get_markets():
-        return MarketsOut(
+    @app.get("/api/rooms/{room_id}/markets", response_model=MarketsOut)
+    def get_markets(request: Request, room_id: str = DEFAULT_ROOM_ID):
+        get_room(room_id)
+        markets = MarketsOut(
             commodities=market_commodities,
             cryptos=market_cryptos,
             updated_ts=market_updated_ts,
         )
+        return negotiated(request, markets)
+
+
+    # The body is parsed by hand so agents can send msgpack; document it for the OpenAPI page.
+    POST_BODY_OPENAPI = {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": PostIn.model_json_schema()},
+                MSGPACK_MEDIA_TYPE: {"schema": PostIn.model_json_schema()},
+            },
+        }
+    }
 
 
-    @app.post("/api/post", response_model=Post)
-    def post_note(note: PostIn):
-        global next_post_id
+    @app.post("/api/post", response_model=Post, openapi_extra=POST_BODY_OPENAPI)
+    @app.post("/api/rooms/{room_id}/post", response_model=Post, openapi_extra=POST_BODY_OPENAPI)
+    async def post_note(request: Request, room_id: str = DEFAULT_ROOM_ID):
+        raw = await request.body()
+        try:
+            if request.headers.get("content-type", "").startswith(MSGPACK_MEDIA_TYPE):
+                note = PostIn(**msgpack.unpackb(raw, raw=False))
+            else:
+                note = PostIn.model_validate_json(raw)
+        except Exception:
+            raise HTTPException(status_code=422, detail="invalid post body")
+        room = get_room(room_id)
 
         agent = note.agent.strip() if note.agent else ""
         text = note.text.strip() if note.text else ""
         if not agent or not text:
             raise HTTPException(status_code=400, detail="agent and text are required")
 
-        ensure_agent(agent)
+        room.ensure_agent(agent)
 
         reply_to = note.reply_to
-        if reply_to is not None and not any(p.id == reply_to for p in posts):
-            reply_to = None
-
-        post = Post(id=next_post_id, ts=time.time(), agent=agent, text=text, reply_to=reply_to)
-        posts.append(post)
-        next_post_id += 1
-        trim_list(posts, MAX_POSTS)
-
-        maybe_paper_trade(agent, text)
-        return post
+        target = None
+        if reply_to is not None:
+            target = room.posts_by_id.get(reply_to)
+            if target is None:
+                reply_to = None
+
+        post = Post(id=room.next_post_id, ts=time.time(), agent=agent, text=text, reply_to=reply_to)
+        room.append_post(post)
+        room.next_post_id += 1
+        if target is not None and target.agent != agent:
+            room.publish_wake("reply", target.agent, post.id)
+
+        room.maybe_paper_trade(agent, text)
+        return negotiated(request, post)
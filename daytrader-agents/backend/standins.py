@@ -0,0 +1,380 @@
+import os
+import re
+import math
+import time
+import random
+import asyncio
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from agent import build_stub_note
+from common import profile_for_agent
+
+# Local stand-ins for the upstream APIs the hub and agents call: Reddit listings, Yahoo quotes,
+# CoinGecko markets and Anthropic messages, with the response shapes fetch_reddit_items,
+# fetch_commodities, fetch_cryptos and claude_generate read. Each upstream gets a fault profile
+# (latency distribution, error rate, 429 bursts, payload size) from STANDIN_* env vars, and it
+# can be changed at runtime through /_standin/config/{service}.
+#
+#   uvicorn standins:app --port 9100
+#   REDDIT_BASE_URL=http://localhost:9100
+#   YAHOO_QUOTE_URL=http://localhost:9100/v7/finance/quote
+#   COINGECKO_BASE_URL=http://localhost:9100/api/v3
+#   ANTHROPIC_BASE_URL=http://localhost:9100   (agents only call it when ANTHROPIC_API_KEY is set)
+
+STANDIN_SEED = os.getenv("STANDIN_SEED", "42").strip()
+SERVICES = ("reddit", "yahoo", "coingecko", "anthropic")
+
+app = FastAPI(title="Upstream stand-ins")
+
+
+# -----------------------------------------
+# Fault profiles
+# -----------------------------------------
+class FaultProfile(BaseModel):
+    # fixed:MS | uniform:LO:HI | normal:MEAN:SD | lognormal:MEDIAN:SIGMA | exp:MEAN (milliseconds)
+    latency: str = "fixed:0"
+    error_rate: float = 0.0
+    error_status: int = 503
+    # Every burst_every_seconds, answer 429 for burst_seconds (0 disables).
+    burst_every_seconds: float = 0.0
+    burst_seconds: float = 0.0
+    # Rows per response (0 = what the caller asked for) and filler bytes per row / message.
+    items: int = 0
+    pad_bytes: int = 0
+
+
+def sample_latency_ms(spec: str, rng: random.Random) -> float:
+    kind, _, rest = spec.strip().lower().partition(":")
+    try:
+        args = [float(x) for x in rest.split(":") if x.strip()]
+        if kind == "fixed":
+            ms = args[0] if args else 0.0
+        elif kind == "uniform":
+            ms = rng.uniform(args[0], args[1])
+        elif kind == "normal":
+            ms = rng.gauss(args[0], args[1])
+        elif kind == "lognormal":
+            ms = args[0] * math.exp(rng.gauss(0.0, args[1]))
+        elif kind == "exp":
+            ms = rng.expovariate(1.0 / args[0]) if args[0] > 0 else 0.0
+        else:
+            raise ValueError(f"unknown latency distribution: {kind or spec!r}")
+    except IndexError:
+        raise ValueError(f"missing parameters in latency spec: {spec!r}")
+    return max(0.0, ms)
+
+
+def env_profile(service: str) -> FaultProfile:
+    # STANDIN_<SERVICE>_<FIELD> wins over STANDIN_<FIELD>, e.g. STANDIN_ANTHROPIC_LATENCY=lognormal:800:0.5
+    values: Dict[str, str] = {}
+    for field in FaultProfile.model_fields:
+        raw = os.getenv(f"STANDIN_{service.upper()}_{field.upper()}", os.getenv(f"STANDIN_{field.upper()}"))
+        if raw is not None and raw.strip():
+            values[field] = raw.strip()
+    profile = FaultProfile(**values)
+    sample_latency_ms(profile.latency, random.Random())
+    return profile
+
+
+def error_body(service: str, status: int) -> Dict:
+    message = "Too Many Requests" if status == 429 else "stand-in injected failure"
+    if service == "anthropic":
+        kind = {429: "rate_limit_error", 529: "overloaded_error"}.get(status, "api_error")
+        return {"type": "error", "error": {"type": kind, "message": message}}
+    if service == "yahoo":
+        return {"finance": {"result": None, "error": {"code": str(status), "description": message}}}
+    if service == "coingecko":
+        return {"status": {"error_code": status, "error_message": message}}
+    return {"message": message, "error": status}
+
+
+class Upstream:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.profile = env_profile(name)
+        self.rng = random.Random(f"{STANDIN_SEED}:{name}")
+        self.started = time.monotonic()
+        self.prices: Dict[str, float] = {}
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.stats: Dict[str, float] = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0, "latency_ms": 0.0}
+
+    def burst_retry_after(self) -> Optional[float]:
+        p = self.profile
+        if p.burst_every_seconds <= 0 or p.burst_seconds <= 0:
+            return None
+        phase = (time.monotonic() - self.started) % p.burst_every_seconds
+        if phase >= p.burst_seconds:
+            return None
+        return p.burst_seconds - phase
+
+    async def fault(self) -> Optional[JSONResponse]:
+        # Rate-limit rejections come back immediately; everything else pays the sampled latency.
+        p = self.profile
+        self.stats["requests"] += 1
+        retry_after = self.burst_retry_after()
+        if retry_after is not None:
+            self.stats["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                content=error_body(self.name, 429),
+                headers={"retry-after": str(max(1, math.ceil(retry_after)))},
+            )
+        delay_ms = sample_latency_ms(p.latency, self.rng)
+        self.stats["latency_ms"] += delay_ms
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000.0)
+        if p.error_rate > 0 and self.rng.random() < p.error_rate:
+            self.stats["errors"] += 1
+            return JSONResponse(status_code=p.error_status, content=error_body(self.name, p.error_status))
+        self.stats["ok"] += 1
+        return None
+
+    def walk(self, key: str, start: float, vol_pct: float = 0.4) -> float:
+        price = self.prices.get(key, start)
+        price = max(start * 0.05, price * (1 + self.rng.gauss(0, vol_pct) / 100.0))
+        self.prices[key] = price
+        return price
+
+    def filler(self) -> str:
+        n = self.profile.pad_bytes
+        if n <= 0:
+            return ""
+        words: List[str] = []
+        size = 0
+        while size < n:
+            word = self.rng.choice(FILLER_WORDS)
+            words.append(word)
+            size += len(word) + 1
+        return " ".join(words)[:n]
+
+
+# -----------------------------------------
+# Payload generators
+# -----------------------------------------
+FILLER_WORDS = [
+    "liquidity", "basis", "curve", "carry", "roll", "spread", "bid", "offer", "flow", "gamma",
+    "vol", "skew", "macro", "print", "guidance", "margin", "supply", "demand", "inventory", "hedge",
+]
+TITLE_SUBJECTS = [
+    "Gold", "Silver", "Crude oil", "Copper", "Nasdaq futures", "S&P 500", "Bitcoin", "Ethereum",
+    "Treasury yields", "The dollar", "Natural gas", "Semis", "Regional banks", "Small caps",
+]
+TITLE_VERBS = ["jumps", "slides", "stalls", "rips", "dumps", "grinds higher", "breaks out", "fades"]
+TITLE_REASONS = [
+    "after Fed holds rates",
+    "ahead of CPI print",
+    "as 50bps cut odds rise",
+    "on China demand worries",
+    "after OPEC+ surprise",
+    "as earnings season kicks off",
+    "on weak jobs data",
+    "after hot PPI",
+    "as short interest hits record",
+    "into quad witching",
+]
+COMMODITY_NAMES = {"GC=F": ("Gold", 2400.0), "SI=F": ("Silver", 29.0), "CL=F": ("Crude Oil", 78.0), "HG=F": ("Copper", 4.3)}
+COINS = [
+    ("bitcoin", "btc", "Bitcoin", 65000.0),
+    ("ethereum", "eth", "Ethereum", 3200.0),
+    ("tether", "usdt", "Tether", 1.0),
+    ("binancecoin", "bnb", "BNB", 580.0),
+    ("solana", "sol", "Solana", 150.0),
+    ("ripple", "xrp", "XRP", 0.55),
+    ("dogecoin", "doge", "Dogecoin", 0.14),
+    ("cardano", "ada", "Cardano", 0.45),
+]
+CURRENT_PRICE_RE = re.compile(r"Current price:\s*([0-9]+(?:\.[0-9]+)?)")
+
+
+def base36(n: int) -> str:
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    out = ""
+    while True:
+        n, r = divmod(n, 36)
+        out = digits[r] + out
+        if n == 0:
+            return out
+
+
+def reddit_post(up: Upstream, subreddit: str) -> Dict:
+    rng = up.rng
+    post_id = base36(rng.getrandbits(36))
+    title = f"{rng.choice(TITLE_SUBJECTS)} {rng.choice(TITLE_VERBS)} {rng.choice(TITLE_REASONS)}"
+    permalink = f"/r/{subreddit}/comments/{post_id}/{title.lower().replace(' ', '_')[:40]}/"
+    return {
+        "kind": "t3",
+        "data": {
+            "name": f"t3_{post_id}",
+            "id": post_id,
+            "subreddit": subreddit,
+            "title": title,
+            "permalink": permalink,
+            "url": f"https://www.reddit.com{permalink}" if rng.random() < 0.6 else f"https://news.example.com/{post_id}",
+            "created_utc": time.time() - rng.uniform(0, 86400),
+            "score": int(rng.paretovariate(1.2) * 10),
+            "over_18": rng.random() < 0.02,
+            "selftext": up.filler(),
+        },
+    }
+
+
+def spark_series(up: Upstream, end_price: float, points: int) -> List[float]:
+    series = [end_price]
+    for _ in range(points - 1):
+        series.append(series[-1] * (1 + up.rng.gauss(0, 0.6) / 100.0))
+    series.reverse()
+    return series
+
+
+# -----------------------------------------
+# Routes
+# -----------------------------------------
+upstreams: Dict[str, Upstream] = {name: Upstream(name) for name in SERVICES}
+
+
+@app.get("/health")
+def health():
+    return {"mode": "standins", "services": list(SERVICES)}
+
+
+@app.get("/_standin/config", response_model=Dict[str, FaultProfile])
+def get_fault_config():
+    return {name: up.profile for name, up in upstreams.items()}
+
+
+@app.put("/_standin/config/{service}", response_model=FaultProfile)
+def set_fault_config(service: str, profile: FaultProfile):
+    up = upstreams.get(service)
+    if up is None:
+        raise HTTPException(status_code=404, detail=f"unknown service: {service}")
+    try:
+        sample_latency_ms(profile.latency, random.Random())
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    up.profile = profile
+    up.started = time.monotonic()
+    return profile
+
+
+@app.get("/_standin/stats")
+def get_fault_stats():
+    return {name: up.stats for name, up in upstreams.items()}
+
+
+@app.delete("/_standin/stats")
+def reset_fault_stats():
+    for up in upstreams.values():
+        up.reset_stats()
+    return {"reset": True}
+
+
+@app.get("/r/{subreddit}/{mode}.json")
+async def reddit_listing(subreddit: str, mode: str, limit: int = 25):
+    up = upstreams["reddit"]
+    failure = await up.fault()
+    if failure is not None:
+        return failure
+    count = up.profile.items or max(0, min(limit, 100))
+    children = [reddit_post(up, subreddit) for _ in range(count)]
+    return {"kind": "Listing", "data": {"after": None, "dist": count, "children": children}}
+
+
+@app.get("/v7/finance/quote")
+async def yahoo_quote(symbols: str = ""):
+    up = upstreams["yahoo"]
+    failure = await up.fault()
+    if failure is not None:
+        return failure
+    wanted = [s.strip() for s in symbols.split(",") if s.strip()]
+    if up.profile.items:
+        wanted = (wanted + [f"STANDIN{i}=F" for i in range(up.profile.items)])[: up.profile.items]
+    result = []
+    for symbol in wanted:
+        name, start = COMMODITY_NAMES.get(symbol, (symbol, 100.0))
+        price = up.walk(symbol, start)
+        row = {
+            "symbol": symbol,
+            "shortName": name,
+            "quoteType": "FUTURE",
+            "currency": "USD",
+            "regularMarketPrice": round(price, 4),
+            "regularMarketPreviousClose": round(start, 4),
+            "regularMarketChangePercent": (price / start - 1.0) * 100.0,
+        }
+        if up.profile.pad_bytes:
+            row["longName"] = up.filler()
+        result.append(row)
+    return {"quoteResponse": {"result": result, "error": None}}
+
+
+@app.get("/api/v3/coins/markets")
+async def coingecko_markets(per_page: int = 100, page: int = 1, sparkline: bool = False):
+    up = upstreams["coingecko"]
+    failure = await up.fault()
+    if failure is not None:
+        return failure
+    count = up.profile.items or max(0, min(per_page, 250))
+    rows = []
+    for i in range((page - 1) * count, page * count):
+        if i < len(COINS):
+            coin_id, symbol, name, start = COINS[i]
+        else:
+            coin_id, symbol, name, start = f"standin-{i}", f"sx{i}", f"Standin {i}", 10.0
+        price = up.walk(coin_id, start, vol_pct=1.0)
+        row = {
+            "id": coin_id,
+            "symbol": symbol,
+            "name": name,
+            "current_price": price,
+            "market_cap": price * 1e7 / (i + 1),
+            "market_cap_rank": i + 1,
+            "price_change_percentage_24h": (price / start - 1.0) * 100.0,
+            "price_change_percentage_7d_in_currency": up.rng.gauss(0, 6.0),
+        }
+        if sparkline:
+            row["sparkline_in_7d"] = {"price": spark_series(up, price, 168)}
+        if up.profile.pad_bytes:
+            row["description"] = up.filler()
+        rows.append(row)
+    return rows
+
+
+@app.post("/v1/messages")
+async def anthropic_messages(request: Request):
+    up = upstreams["anthropic"]
+    failure = await up.fault()
+    if failure is not None:
+        return failure
+    try:
+        body = await request.json()
+    except Exception:
+        return JSONResponse(status_code=400, content=error_body("anthropic", 400))
+    messages = body.get("messages") or []
+    prompt = messages[-1].get("content", "") if messages else ""
+    if not isinstance(prompt, str):
+        prompt = ""
+    match = CURRENT_PRICE_RE.search(prompt)
+    price = float(match.group(1)) if match else 100.0
+    profile = profile_for_agent(f"Agent_{up.rng.randint(1, 99):02d}")
+    text = build_stub_note(price, profile)
+    if up.profile.pad_bytes:
+        text = f"{text}\nNotes: {up.filler()}"
+    return {
+        "id": f"msg_standin_{up.rng.getrandbits(48):012x}",
+        "type": "message",
+        "role": "assistant",
+        "model": body.get("model", ""),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {
+            "input_tokens": (len(body.get("system") or "") + len(prompt)) // 4,
+            "output_tokens": len(text) // 4,
+        },
+    }
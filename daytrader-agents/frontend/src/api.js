@@ -1,26 +1,28 @@
 const API_BASE = import.meta.env.VITE_API_BASE || "http://localhost:8000";
+const ROOM = import.meta.env.VITE_ROOM || "";
+const API_PREFIX = ROOM ? `${API_BASE}/api/rooms/${encodeURIComponent(ROOM)}` : `${API_BASE}/api`;
 
 export async function getConfig() {
-  const r = await fetch(`${API_BASE}/api/config`);
+  const r = await fetch(`${API_PREFIX}/config`);
   return r.json();
 }
 
 export async function getState() {
-  const r = await fetch(`${API_BASE}/api/state?limit_posts=200&limit_trades=200`);
+  const r = await fetch(`${API_PREFIX}/state?limit_posts=200&limit_trades=200`);
   return r.json();
 }
 
 export async function getPnL() {
-  const r = await fetch(`${API_BASE}/api/pnl`);
+  const r = await fetch(`${API_PREFIX}/pnl`);
   return r.json();
 }
 
 export async function getResearch() {
-  const r = await fetch(`${API_BASE}/api/research`);
+  const r = await fetch(`${API_PREFIX}/research`);
   return r.json();
 }
 
 export async function getMarkets() {
-  const r = await fetch(`${API_BASE}/api/markets`);
+  const r = await fetch(`${API_PREFIX}/markets`);
   return r.json();
 }